@@ -0,0 +1,173 @@
+"""Storage backends for the dashboard.
+
+Both backends expose ``read_sql(query, params=None) -> DataFrame`` and accept
+the MySQL-flavoured SQL used in phonepe.py (``%s`` placeholders, CONCAT):
+
+* MySQLBackend  - the original SQLAlchemy/PyMySQL engine, with a tuned pool
+  (``make_engine``) whose usage ``pool_status()`` reports.
+* DuckDBBackend - in-process and serverless.  Each Pulse table is a view over
+  the Parquet files written by ``load.refresh_parquet`` and the rollups are
+  materialised when the backend opens (and on ``reload``), so queries are
+  vectorised scans with no network round trip.
+
+``data_version()`` returns the counter ingestion bumps after every load, which
+query_cache.py uses to invalidate cached results.
+
+``get_backend()`` picks one from ``PHONEPE_BACKEND`` (see config.py).
+"""
+import glob
+import os
+import threading
+import time
+
+import pandas as pd
+
+import config
+import rollups
+import schema
+
+
+def make_engine(url=config.MYSQL_URL, pool_size=config.MYSQL_POOL_SIZE,
+                max_overflow=config.MYSQL_MAX_OVERFLOW, pool_timeout=config.MYSQL_POOL_TIMEOUT,
+                pool_recycle=config.MYSQL_POOL_RECYCLE, query_timeout=config.MYSQL_QUERY_TIMEOUT):
+    """SQLAlchemy engine with a sized pool, pre-ping, recycling and a statement timeout.
+
+    Connections are checked with a ping before use and replaced after
+    ``pool_recycle`` seconds, so MySQL's ``wait_timeout`` never hands the app a
+    dead one.  ``query_timeout`` (seconds, 0 = none) becomes the session's
+    ``max_execution_time`` and the driver's read timeout.
+    """
+    from sqlalchemy import create_engine, event
+
+    connect_args = {"read_timeout": query_timeout} if query_timeout and url.startswith("mysql+pymysql") else {}
+    engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                           pool_recycle=pool_recycle, pool_pre_ping=True, connect_args=connect_args)
+    if query_timeout and engine.dialect.name == "mysql":
+        @event.listens_for(engine, "connect")
+        def set_timeout(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SET SESSION max_execution_time = %d" % (query_timeout * 1000))
+            cursor.close()
+    return engine
+
+
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, url=config.MYSQL_URL, **pool):
+        self.engine = make_engine(url, **pool)
+        self.max_overflow = pool.get("max_overflow", config.MYSQL_MAX_OVERFLOW)
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+
+    def read_sql(self, query, params=None):
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            self._record_wait(time.perf_counter() - start)
+            return pd.read_sql(query, conn, params=params)
+
+    def _record_wait(self, seconds):
+        with self.lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def pool_status(self):
+        """Connections in use and checkout wait times, for the operations panel."""
+        pool = self.engine.pool
+        with self.lock:
+            avg = self.wait_seconds / self.waits if self.waits else 0.0
+            return {"size": pool.size(), "checked_out": pool.checkedout(), "idle": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0), "max_overflow": self.max_overflow,
+                    "checkouts": self.waits, "avg_wait_ms": round(avg * 1000, 2),
+                    "max_wait_ms": round(self.max_wait * 1000, 2)}
+
+    def data_version(self):
+        try:
+            df = self.read_sql("SELECT version FROM pulse_version WHERE id = 1")
+        except Exception:
+            return 0  # nothing loaded through load.refresh yet
+        return int(df["version"].iloc[0]) if not df.empty else 0
+
+
+DUCKDB_TYPES = {"object": "VARCHAR", "int64": "BIGINT", "float64": "DOUBLE"}
+
+
+def parquet_version(directory=config.PARQUET_DIR):
+    """Data version of a Parquet store, bumped by load.refresh_parquet."""
+    try:
+        with open(os.path.join(directory, "_version"), "r") as fh:
+            return int(fh.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_parquet_version(directory=config.PARQUET_DIR):
+    path = os.path.join(directory, "_version")
+    with open(path + ".tmp", "w") as fh:
+        fh.write(str(parquet_version(directory) + 1))
+    os.replace(path + ".tmp", path)
+
+
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self, directory=config.PARQUET_DIR):
+        import duckdb
+
+        self.connect = duckdb.connect
+        self.directory = directory
+        self.reload()
+
+    def reload(self):
+        """Rebuild views and rollups from the current Parquet files, then swap them in."""
+        con = self.connect(":memory:")
+        for table in schema.TABLES:
+            self._register(con, table)
+        for table, select in rollups.ROLLUP_SELECT.items():
+            con.execute("CREATE TABLE {} AS {}".format(table, select()))
+            self._narrow_sums(con, table)
+        self.con = con
+
+    def data_version(self):
+        return parquet_version(self.directory)
+
+    def _register(self, con, table):
+        pattern = os.path.join(self.directory, table, "*.parquet")
+        if glob.glob(pattern):
+            con.execute(
+                "CREATE VIEW {} AS SELECT {} FROM read_parquet('{}', union_by_name = true)".format(
+                    table, ", ".join(schema.columns(table)), pattern.replace("'", "''")))
+        else:
+            columns = ", ".join("{} {}".format(c, DUCKDB_TYPES[t])
+                                for c, t in schema.pandas_dtypes(table).items())
+            con.execute("CREATE TABLE {} ({})".format(table, columns))
+
+    def _narrow_sums(self, con, table):
+        # DuckDB widens SUM(BIGINT) to HUGEINT, which pandas would turn into float
+        wide = con.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = ? AND data_type = 'HUGEINT'", [table]).fetchall()
+        for (column,) in wide:
+            con.execute("ALTER TABLE {} ALTER {} TYPE BIGINT".format(table, column))
+
+    def read_sql(self, query, params=None):
+        # a cursor is a separate connection to the same database, safe per thread
+        cursor = self.con.cursor()
+        try:
+            return cursor.execute(query.replace("%s", "?"), list(params or ())).df()
+        finally:
+            cursor.close()
+
+
+BACKENDS = {"mysql": MySQLBackend, "duckdb": DuckDBBackend}
+
+
+def get_backend(name=None):
+    name = (name or config.BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError("Unknown PHONEPE_BACKEND {!r}; expected one of {}".format(
+            name, ", ".join(BACKENDS)))
+    return BACKENDS[name]()
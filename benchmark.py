@@ -0,0 +1,223 @@
+"""Benchmarks for ingestion, queries and page renders on synthetic Pulse data.
+
+    python benchmark.py                      # 36 states x 30 districts, 2018-2024
+    python benchmark.py --states 10 --years 2022 2024 --repeat 5
+    python benchmark.py --mysql-url mysql+pymysql://user:pw@host/bench   # also time the MySQL load
+
+Every run generates a Pulse tree with synthetic.py in a scratch directory and
+times, in order:
+
+* generate            writing the JSON tree
+* extract_serial / extract_parallel   ingest.extract_all (the notebook's extractors)
+* load_parquet        load.refresh_parquet
+* load_mysql          load.refresh (only with --mysql-url; the database should be empty)
+* duckdb_open         DuckDBBackend over the Parquet files, rollups included
+* sql:<name>          every read in data_access.py, uncached (median of --repeat)
+* render:*            a headless AppTest run of the Home page and each case
+                      study, cold and then warm, in a child process using the
+                      DuckDB backend and synthetic boundaries
+
+Results are appended to ``--out`` (JSON lines) and compared with the previous
+run at the same scale; steps slower by more than ``--threshold`` are flagged.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def median_time(fn, repeat):
+    return statistics.median(timed(fn) for _ in range(repeat))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# STAGES
+def bench_ingest(results, root, workdir, scale, workers):
+    import ingest
+    import load
+    import synthetic
+
+    results["generate"] = timed(synthetic.generate, root, states=scale["states"],
+                                districts_per_state=scale["districts"], years=tuple(scale["years"]))
+    results["extract_serial"] = timed(ingest.extract_all, root=root, workers=1)
+    results["extract_parallel"] = timed(ingest.extract_all, root=root, workers=workers)
+    results["load_parquet"] = timed(load.refresh_parquet, os.path.join(workdir, "parquet"), root=root,
+                                    workers=workers)
+
+
+def bench_mysql(results, root, workdir, url, workers):
+    import pymysql
+    from sqlalchemy.engine import make_url
+
+    import load
+
+    u = make_url(url)
+    conn = pymysql.connect(host=u.host or "127.0.0.1", port=u.port or 3306, user=u.username,
+                           password=u.password, database=u.database, local_infile=True)
+    try:
+        results["load_mysql"] = timed(load.refresh, conn, root=root, workers=workers,
+                                      manifest_path=os.path.join(workdir, "mysql_manifest.json"))
+    finally:
+        conn.close()
+
+
+def bench_queries(results, workdir, repeat):
+    import data_access as da
+    import warmup
+    from backend import DuckDBBackend
+
+    directory = os.path.join(workdir, "parquet")
+    results["duckdb_open"] = timed(DuckDBBackend, directory)
+    db = DuckDBBackend(directory)
+    (year, quarter), = warmup.latest_periods(db, 1)
+    # the same per-quarter reads the pages use and warm-up fills (top_pincodes included)
+    for name, fn in warmup.PERIOD_SLICES.items():
+        results["sql:" + name] = median_time(lambda: fn(db, year, quarter), repeat)
+    for name in ("states", "state_history", "brand_history", "insurance_history"):
+        fn = getattr(da, name)
+        results["sql:" + name] = median_time(lambda: fn(db), repeat)
+
+
+def bench_render(results, workdir):
+    """Run ``render_timings`` in a child process configured for the synthetic store."""
+    env = dict(os.environ, PHONEPE_BACKEND="duckdb", PHONEPE_PARQUET_DIR=os.path.join(workdir, "parquet"),
+               PHONEPE_GEO_DIR=os.path.join(workdir, "geo"), PHONEPE_GEO_URL="",
+               PHONEPE_WARMUP_QUARTERS="0", QUERY_CACHE_SHARED="")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--render-child"], cwd=HERE, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    results.update(json.loads(out.strip().splitlines()[-1]))
+
+
+def _case_study_page():
+    import case_studies
+    case_studies.render()
+
+
+def timed_run(at, run, page):
+    """Seconds of ``run()`` (an AppTest run); raises if the page raised."""
+    seconds = timed(run)
+    if at.exception:
+        raise RuntimeError("{} failed: {}".format(page, at.exception[0].value))
+    return seconds
+
+
+def render_timings():
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+    at = AppTest.from_file(os.path.join(HERE, "phonepe.py"), default_timeout=600)
+    timings["render:home:cold"] = timed_run(at, at.run, "home")
+    timings["render:home:warm"] = timed_run(at, at.run, "home")
+
+    at = AppTest.from_function(_case_study_page, default_timeout=600)
+    timed_run(at, at.run, "case study page")
+    selector = at.selectbox(key="business_case_study_selector")
+    for i, question in enumerate(selector.options, 1):
+        page = "case study {}".format(i)
+        timings["render:case_study_{}:cold".format(i)] = timed_run(at, selector.set_value(question).run, page)
+        timings["render:case_study_{}:warm".format(i)] = timed_run(at, at.run, page)
+        selector = at.selectbox(key="business_case_study_selector")
+    return timings
+
+
+# RESULTS
+def previous_run(path, scale):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            run = json.loads(line)
+            if run.get("scale") == scale:
+                last = run
+    return last
+
+
+def compare(previous, current, threshold):
+    """Lines of a step-by-step comparison; regressions beyond ``threshold`` are marked."""
+    lines = ["{:<32} {:>10} {:>10} {:>8}".format("step", "previous", "current", "ratio")]
+    for name, seconds in current["results"].items():
+        before = previous["results"].get(name) if previous else None
+        if before:
+            ratio = seconds / before
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            lines.append("{:<32} {:>10.4f} {:>10.4f} {:>7.2f}x{}".format(name, before, seconds, ratio, flag))
+        else:
+            lines.append("{:<32} {:>10} {:>10.4f}".format(name, "-", seconds))
+    return lines
+
+
+def run(states=36, districts=30, years=(2018, 2024), repeat=3, workers=None, mysql_url=None,
+        render=True, out=os.path.join(HERE, "benchmarks", "results.jsonl"), threshold=0.25, keep=None):
+    import synthetic
+
+    scale = {"states": states, "districts": districts, "years": list(years)}
+    workdir = keep or tempfile.mkdtemp(prefix="pulse-bench-")
+    root = os.path.join(workdir, "pulse", "data")
+    results = {}
+    try:
+        bench_ingest(results, root, workdir, scale, workers)
+        if mysql_url:
+            bench_mysql(results, root, workdir, mysql_url, workers)
+        bench_queries(results, workdir, repeat)
+        if render:
+            synthetic.write_boundaries(os.path.join(workdir, "geo"), states=states)
+            bench_render(results, workdir)
+    finally:
+        if keep is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    current = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "scale": scale,
+               "results": {k: round(v, 5) for k, v in results.items()}}
+    previous = previous_run(out, scale)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(current) + "\n")
+    return current, compare(previous, current, threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--states", type=int, default=36)
+    parser.add_argument("--districts", type=int, default=30)
+    parser.add_argument("--years", type=int, nargs=2, default=(2018, 2024))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mysql-url", default=None)
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument("--out", default=os.path.join(HERE, "benchmarks", "results.jsonl"))
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--keep", default=None, help="work in (and keep) this directory")
+    parser.add_argument("--render-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.render_child:
+        print(json.dumps(render_timings()))
+        return
+    _, lines = run(args.states, args.districts, tuple(args.years), args.repeat, args.workers, args.mysql_url,
+                   not args.no_render, args.out, args.threshold, args.keep)
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Business case study page.
+
+Only the selected case study runs, and each one is a fragment: changing its
+own year, quarter or state reruns that case study and nothing else.  The
+reads and figures of each case study are in reports.py; this page picks the
+filters and lays the sections out.
+"""
+import streamlit as st
+
+import dashboard
+import reports
+
+question_list = [question for question, _ in reports.CASE_STUDIES]
+
+
+def show_sections(sections):
+    for section in sections:
+        if section.title:
+            st.markdown("### " + section.title)
+        if not section.charts:
+            st.warning(section.warning)
+        elif len(section.charts) == 1:
+            st.plotly_chart(section.charts[0].figure, use_container_width=True)
+        else:
+            for column, chart in zip(st.columns(len(section.charts)), section.charts):
+                with column:
+                    st.plotly_chart(chart.figure, use_container_width=True)
+
+
+def filters(prefix, states_list, suffix=""):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        year = st.selectbox(" Year", list(range(2018, 2025)), key=f"{prefix}_year{suffix}")
+    with col2:
+        quarter = st.selectbox(" Quarter", [1, 2, 3, 4], key=f"{prefix}_quarter{suffix}")
+    with col3:
+        state = st.selectbox(" State", states_list, key=f"{prefix}_state{suffix}")
+    return year, quarter, state
+
+
+# CASE STUDY 1:
+@st.fragment
+def show_case_study_1(db, states_list, geometry):
+    year, quarter, state = filters("cs1", states_list)
+    show_sections(reports.case_study_1(db, dashboard, year, quarter, state, geometry))
+
+
+# CASE STUDY 2
+@st.fragment
+def show_case_study_2(db, states_list, geometry):
+    year, quarter, state = filters("cs2", states_list)
+    show_sections(reports.case_study_2(db, dashboard, year, quarter, state, geometry))
+
+
+# CASE STUDY 3
+@st.fragment
+def show_case_study_3(db, states_list, geometry):
+    year, quarter, state = filters("cs3", states_list, suffix="_unique")
+    show_sections(reports.case_study_3(db, dashboard, year, quarter, state, geometry))
+
+
+# CASE STUDY 4
+@st.fragment
+def show_case_study_4(db, states_list, geometry):
+    year, quarter, state = filters("cs4", states_list, suffix="_unique")
+    show_sections(reports.case_study_4(db, dashboard, year, quarter, state, geometry))
+
+
+# CASE STUDY 5
+@st.fragment
+def show_case_study_5(db, states_list, geometry):
+    year, quarter, state = filters("cs5", states_list)
+    show_sections(reports.case_study_5(db, dashboard, year, quarter, state, geometry))
+
+
+def render():
+    st.markdown("## BUSINESS CASE STUDY")
+
+    selected_question = st.selectbox("Select a Case Study", question_list, key="business_case_study_selector")
+
+    db = dashboard.get_connection()
+    states_list = dashboard.get_states(db)
+    geometry = dashboard.get_geometry()
+
+    if selected_question == question_list[0]:
+        show_case_study_1(db, states_list, geometry)
+    elif selected_question == question_list[1]:
+        show_case_study_2(db, states_list, geometry)
+    elif selected_question == question_list[2]:
+        show_case_study_3(db, states_list, geometry)
+    elif selected_question == question_list[3]:
+        show_case_study_4(db, states_list, geometry)
+    elif selected_question == question_list[4]:
+        show_case_study_5(db, states_list, geometry)
@@ -0,0 +1,312 @@
+"""Every Pulse metric the pages read, in memory as integer-coded arrays.
+
+The dataset is small enough for RAM, so ``Cube.load`` reads the tables the
+pages use once per data version and keeps each as a ``Fact``:
+
+* dimensions (state, district, transaction type, brand, pincode ...) as
+  int32 codes into sorted label arrays, and year and quarter as one period
+  code (``year * 4 + quarter - 1``);
+* metrics as NumPy columns;
+* rows sorted by (period, state, item), so one quarter, or one state's
+  quarter, is a contiguous range found by binary search.
+
+``Fact.select`` gives those ranges (or a mask for a state across all
+periods); ``frame`` and ``group`` turn a selection into a DataFrame with
+slicing and ``bincount`` rather than SQL.  ``Cube`` then
+answers every read of data_access.py with the same columns and types
+(schema.typed) as its SQL through CachedBackend.  The types are fixed once,
+when a fact is built - metrics cast, and per dimension the category list or
+label type chosen - so a read only slices and wraps codes.
+
+When ingestion has published an Arrow snapshot of the version (see
+snapshot.py), ``load`` memory-maps it instead of querying: the snapshot is
+stored in this layout, so the facts are views of the mapped files, shared
+through the page cache by every worker on the host.
+
+The arrays are read-only and the cube is shared by all sessions: CachedBackend
+serves reads from ``db.cube`` while its version matches (see
+CachedBackend.read_cube) and falls back to SQL otherwise, and
+``load_in_background`` swaps in a new cube after every new data version.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+import data_access as da
+import rollups
+import schema
+import snapshot
+
+log = logging.getLogger(__name__)
+
+# table -> (item dimension or None, metric columns)
+FACTS = {
+    "aggregated_transaction": ("Transaction_type", ("Transaction_count", "Transaction_amount")),
+    "aggregated_user": ("Brands", ("Transaction_count", "Percentage")),
+    "aggregated_insurance": ("Insurance_type", ("Insurance_count", "Insurance_amount")),
+    "top_transaction": ("Pincodes", ("Transaction_count", "Transaction_amount")),
+    "top_insurance": ("Pincodes", ("Transaction_count", "Transaction_amount")),
+    "rollup_state_quarter": (None, rollups.STATE_METRICS),
+    "rollup_district_quarter": ("District", ("Transaction_count", "Transaction_amount", "State_rank",
+                                             "India_rank")),
+}
+
+status = {"state": "idle"}
+
+
+def _numeric(series):
+    values = pd.to_numeric(series).to_numpy()
+    # MySQL returns SUM() and DECIMAL columns as Decimal objects
+    return values.astype(float) if values.dtype == object else values
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+def _typed(name, values):
+    """``values`` of metric ``name`` in its result type (schema.result_type), as typed SQL results are."""
+    dtype = schema.result_type(name)
+    if dtype is None or values.dtype == dtype:
+        return values
+    if np.dtype(dtype).kind in "iu" and np.isnan(values).any():
+        dtype = "float64"
+    return _frozen(values.astype(dtype))
+
+
+class Fact:
+    def __init__(self, item, codes, labels, metrics):
+        """``codes`` (int32 per Period, States and ``item``) and ``metrics`` in (period, state, item) order."""
+        self.item = item
+        self.dims = ["Period", "States"] + ([item] if item else [])
+        self.codes = codes
+        self.labels = labels
+        self.metrics = {m: _typed(m, values) for m, values in metrics.items()}
+        # per dimension, how its codes become a typed column (see _dim); decided once, here
+        self.types = {}
+        for dim in self.dims[1:]:
+            dtype = schema.result_type(dim)
+            if isinstance(dtype, pd.CategoricalDtype) and pd.Index(labels[dim]).isin(dtype.categories).all():
+                self.types[dim] = (dtype, _frozen(dtype.categories.get_indexer(labels[dim]).astype("int32")))
+            elif dtype is None or dtype == "category" or isinstance(dtype, pd.CategoricalDtype):
+                self.types[dim] = (None, pd.Index(labels[dim]))
+            else:
+                labels[dim] = labels[dim].astype(dtype)
+                self.types[dim] = (dtype, None)
+        periods = labels["Period"]
+        self.period_index = {int(p): i for i, p in enumerate(periods)}
+        self.state_index = {s: i for i, s in enumerate(labels["States"])}
+        # rows of period i are bounds[i]:bounds[i + 1]
+        self.bounds = np.searchsorted(codes["Period"], np.arange(len(periods) + 1))
+        self.size = len(codes["Period"])
+
+    @staticmethod
+    def _periods(years, quarters):
+        codes, labels = pd.factorize(years.astype("int64") * 4 + quarters.astype("int64") - 1, sort=True)
+        return _frozen(codes.astype("int32")), np.asarray(labels)
+
+    @classmethod
+    def from_frame(cls, df, item, metrics):
+        """From a query result in any order: dimensions are coded and rows sorted here."""
+        dims = ["States"] + ([item] if item else [])
+        codes, labels = {}, {}
+        codes["Period"], labels["Period"] = cls._periods(df["Years"].to_numpy(), df["Quarter"].to_numpy())
+        for dim in dims:
+            codes[dim], dim_labels = pd.factorize(df[dim], sort=True)
+            labels[dim] = np.asarray(dim_labels)
+        order = np.lexsort([codes[d] for d in reversed(dims)] + [codes["Period"]])
+        return cls(item, {d: _frozen(c[order].astype("int32")) for d, c in codes.items()}, labels,
+                   {m: _frozen(_numeric(df[m])[order]) for m in metrics})
+
+    @classmethod
+    def from_arrow(cls, table, item, metrics):
+        """From a snapshot table (see snapshot.py): already sorted, dimensions dictionary-encoded.
+
+        The codes and metrics are views of the table's buffers, so of a
+        memory-mapped file; only the period codes are computed.
+        """
+        def array(name):
+            column = table.column(name)
+            return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+
+        codes, labels = {}, {}
+        codes["Period"], labels["Period"] = cls._periods(array("Years").to_numpy(), array("Quarter").to_numpy())
+        for dim in ["States"] + ([item] if item else []):
+            column = array(dim)
+            codes[dim] = column.indices.to_numpy()
+            labels[dim] = column.dictionary.to_numpy(zero_copy_only=False)
+        return cls(item, codes, labels, {m: array(m).to_numpy(zero_copy_only=False) for m in metrics})
+
+    # SELECTION
+    def select(self, year=None, quarter=None, state=da.ALL_INDIA):
+        """Rows of one quarter and/or one state: a slice where possible, else an index array."""
+        code = self.state_index.get(state, -1) if state != da.ALL_INDIA else None
+        if year is None:
+            if code is None:
+                return slice(0, self.size)
+            return np.flatnonzero(self.codes["States"] == code)
+        i = self.period_index.get(year * 4 + quarter - 1)
+        if i is None or code == -1:
+            return slice(0, 0)
+        start, stop = self.bounds[i], self.bounds[i + 1]
+        if code is None:
+            return slice(start, stop)
+        states = self.codes["States"][start:stop]
+        return slice(start + np.searchsorted(states, code), start + np.searchsorted(states, code, "right"))
+
+    def _dim(self, name, codes):
+        """Column of dimension ``name`` for ``codes``, typed as schema.typed types SQL results.
+
+        Closed vocabularies are categoricals over the full list, other
+        dimensions categoricals of the labels present, and numeric ones
+        (Pincodes) plain arrays.
+        """
+        dtype, mapping = self.types[name]
+        if isinstance(dtype, pd.CategoricalDtype):
+            return pd.Categorical.from_codes(mapping[codes], dtype=dtype)
+        if mapping is None:
+            return self.labels[name][codes]
+        used = np.flatnonzero(np.bincount(codes, minlength=len(mapping)))
+        recode = np.empty(len(mapping), dtype="int32")
+        recode[used] = np.arange(len(used), dtype="int32")
+        return pd.Categorical.from_codes(recode[codes], dtype=pd.CategoricalDtype(mapping[used]))
+
+    def _period(self, name, periods):
+        values = periods // 4 if name == "Years" else periods % 4 + 1
+        return values.astype(schema.result_type(name))
+
+    def column(self, name, rows):
+        if name in self.metrics:
+            return self.metrics[name][rows]
+        if name in ("Years", "Quarter"):
+            return self._period(name, self.labels["Period"][self.codes["Period"][rows]])
+        return self._dim(name, self.codes[name][rows])
+
+    # OPERATIONS
+    def frame(self, rows, columns):
+        return pd.DataFrame({c: self.column(c, rows) for c in columns})
+
+    def group(self, rows, by, metrics):
+        """Sums of ``metrics`` per combination of the ``by`` dimensions present in ``rows``."""
+        by = [by] if isinstance(by, str) else by
+        # Years and Quarter group together, as the period
+        by = list(dict.fromkeys("Period" if d in ("Years", "Quarter") else d for d in by))
+        shape = [len(self.labels[d]) for d in by]
+        key = np.ravel_multi_index([self.codes[d][rows] for d in by], shape)
+        size = int(np.prod(shape))
+        present = np.flatnonzero(np.bincount(key, minlength=size))
+        out = {}
+        for d, codes in zip(by, np.unravel_index(present, shape)):
+            if d == "Period":
+                periods = self.labels[d][codes]
+                out["Years"], out["Quarter"] = self._period("Years", periods), self._period("Quarter", periods)
+            else:
+                out[d] = self._dim(d, codes)
+        for m in metrics:
+            values = self.metrics[m][rows]
+            out[m] = np.bincount(key, weights=values, minlength=size)[present].astype(values.dtype)
+        return pd.DataFrame(out)
+
+
+class Cube:
+    """The reads of data_access.py, answered from ``Fact``s of one data version."""
+
+    def __init__(self, facts, version=None, source=None):
+        self.facts = facts
+        self.version = version
+        self.source = source
+
+    @classmethod
+    def load(cls, backend, version=None, snapshot_dir=config.SNAPSHOT_DIR):
+        """From the snapshot of ``version`` when one is published, else by querying ``backend``."""
+        tables = snapshot.read(snapshot_dir, version, tuple(FACTS)) if snapshot_dir and version is not None else None
+        if tables is not None:
+            facts = {t: Fact.from_arrow(tables[t], item, metrics) for t, (item, metrics) in FACTS.items()}
+            return cls(facts, version, source="snapshot")
+        facts = {}
+        for table, (item, metrics) in FACTS.items():
+            columns = ["States", "Years", "Quarter"] + ([item] if item else []) + list(metrics)
+            df = backend.read_sql("SELECT {} FROM {}".format(", ".join(columns), table))
+            facts[table] = Fact.from_frame(df, item, metrics)
+        return cls(facts, version, source="sql")
+
+    def nbytes(self):
+        return sum(a.nbytes for f in self.facts.values() for a in list(f.codes.values()) + list(f.metrics.values()))
+
+    def _quarter(self, table, year, quarter, columns):
+        fact = self.facts[table]
+        return fact.frame(fact.select(year, quarter), columns)
+
+    def states(self):
+        return [str(s) for s in self.facts["aggregated_transaction"].labels["States"]]
+
+    def state_quarter(self, year, quarter):
+        return self._quarter("rollup_state_quarter", year, quarter, ["States"] + list(rollups.STATE_METRICS))
+
+    def types_by_state(self, year, quarter):
+        return self._quarter("aggregated_transaction", year, quarter,
+                             ["States", "Transaction_type", "Transaction_count", "Transaction_amount"])
+
+    def brands_by_state(self, year, quarter):
+        return self._quarter("aggregated_user", year, quarter, ["States", "Brands", "Transaction_count"])
+
+    def districts(self, year, quarter):
+        return self._quarter("rollup_district_quarter", year, quarter,
+                             ["States", "District", "Transaction_count", "Transaction_amount", "State_rank",
+                              "India_rank"])
+
+    def top_pincodes(self, year, quarter):
+        return self._quarter("top_transaction", year, quarter,
+                             ["States", "Pincodes", "Transaction_count", "Transaction_amount"])
+
+    def top_insurance_by_state(self, year, quarter):
+        fact = self.facts["top_insurance"]
+        return fact.group(fact.select(year, quarter), "States", ["Transaction_count"])
+
+    def state_history(self):
+        fact = self.facts["rollup_state_quarter"]
+        return fact.frame(fact.select(), ["Years", "Quarter", "States"] + list(rollups.STATE_METRICS))
+
+    def brand_history(self):
+        fact = self.facts["aggregated_user"]
+        return fact.frame(fact.select(), ["Years", "Quarter", "States", "Brands", "Transaction_count"])
+
+    def insurance_history(self):
+        fact = self.facts["aggregated_insurance"]
+        return fact.group(fact.select(), ["Years", "Quarter"], ["Insurance_count"])
+
+
+_lock = threading.Lock()
+
+
+def load_in_background(db):
+    """Build a cube for ``db``'s current version in a daemon thread and attach it as ``db.cube``."""
+    with _lock:
+        if status.get("state") == "loading" and status.get("version") == db.version:
+            return None
+        status.clear()
+        status.update(state="loading", version=db.version)
+    version = db.version
+
+    def run():
+        start = time.perf_counter()
+        try:
+            cube = Cube.load(db.backend, version)
+        except Exception as e:  # reads keep going to SQL
+            log.warning("cube load failed: %s", e)
+            status.update(state="failed", error=str(e))
+            return
+        if version == db.version:
+            db.cube = cube
+        status.update(state="ready", source=cube.source, seconds=round(time.perf_counter() - start, 3), bytes=cube.nbytes(),
+                      rows={t: f.size for t, f in cube.facts.items()})
+        log.info("cube for version %s loaded in %.3fs", version, status["seconds"])
+
+    thread = threading.Thread(target=run, name="cube", daemon=True)
+    thread.start()
+    return thread
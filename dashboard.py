@@ -0,0 +1,87 @@
+"""Resources shared by the dashboard pages (phonepe.py, home.py, case_studies.py).
+
+They are cached per process by Streamlit, so switching pages or rerunning a
+fragment reuses the same connection and boundaries.
+"""
+import streamlit as st
+
+import config
+import cube
+import data_access as da
+import geo
+import ranking
+import timeseries
+import warmup
+from backend import get_backend
+from query_cache import CachedBackend, get_shared_cache
+
+MAP_ZOOM = geo.MAP_ZOOM
+
+
+@st.cache_resource
+def get_connection():
+    db = CachedBackend(get_backend(), shared=get_shared_cache())
+    if config.CUBE:
+        # once loaded (and reloaded after every new load), reads are answered in memory
+        db.on_invalidate.append(lambda: cube.load_in_background(db))
+        cube.load_in_background(db)
+    if config.WARMUP_QUARTERS:
+        # the latest quarters are read into the cache now and after every new load, and the
+        # Streamlit-cached resources the pages build from them (boundaries, series, rankings)
+        extra = [("geometry", lambda: load_geojson(geo.level_for_zoom(MAP_ZOOM))),
+                 ("series", lambda: load_series(db.version, db))]
+        per_period = [lambda y, q: [load_ranking(name, y, q, db.version, db) for name in ranking.RANKINGS]]
+        db.on_invalidate.append(lambda: warmup.warm_in_background(db, extra=extra, per_period=per_period))
+        warmup.warm_in_background(db, extra=extra, per_period=per_period)
+    return db
+
+
+def get_states(db):
+    return [da.ALL_INDIA] + da.states(db)
+
+
+# one per data version; read-only (see timeseries.py)
+@st.cache_resource(max_entries=2)
+def load_series(version, _db):
+    return timeseries.StateSeries.from_history(da.state_history(_db))
+
+
+def get_series(db):
+    return load_series(db.version, db)
+
+
+# one per slice, period and data version (see ranking.py)
+@st.cache_resource(max_entries=96)
+def load_ranking(name, year, quarter, version, _db):
+    return ranking.build(_db, name, year, quarter)
+
+
+def get_ranking(db, name, year, quarter):
+    return load_ranking(name, year, quarter, db.version, db)
+
+
+# shared, read-only: no page modifies it
+@st.cache_resource
+def load_geojson(level):
+    return geo.load(level)
+
+
+def get_geojson(zoom=MAP_ZOOM):
+    try:
+        return load_geojson(geo.level_for_zoom(zoom))
+    except Exception as e:  # not cached, so the next rerun tries again
+        st.warning(f"India state boundaries are not available ({e}); maps are left empty.")
+        return geo.EMPTY
+
+
+def get_geometry(zoom=MAP_ZOOM):
+    """Boundaries for plotly choropleths.
+
+    With PHONEPE_GEO_URL set (Streamlit static serving, see .streamlit/config.toml)
+    this is the URL of the GeoJSON file, which the browser downloads once and
+    every figure refers to; otherwise the FeatureCollection itself.
+    """
+    geojson = get_geojson(zoom)
+    if config.GEO_URL and geojson["features"]:
+        return geo.level_url(geo.level_for_zoom(zoom))
+    return geojson
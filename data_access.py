@@ -0,0 +1,198 @@
+"""Shared datasets behind the Home tab and the business case studies.
+
+Most dashboard queries used to be per-widget variants of the same few reads
+("All India" vs one state, top-N vs full list, counts vs ratios).  Each
+function here fetches one (table, year, quarter) slice - or one full history
+- and the pages derive state filters, top-N lists, pie shares and ratios from
+it in pandas.  The slices go through the shared CachedBackend, so a page
+render costs a handful of round trips however many charts it draws.
+
+``fetch`` runs a page's reads concurrently on one shared, bounded thread pool,
+so its latency is the slowest read rather than the sum of them.  Each worker
+checks a connection out of the backend's own pool (SQLAlchemy's QueuePool for
+MySQL, a cursor per call for DuckDB), so ``FETCH_WORKERS`` should not exceed
+the engine pool size.
+
+Every read function is ``@metrics.named``, so its timings, rows and cache
+outcome are recorded under the function's name (see metrics.py).
+
+Every read is also ``@cubed``: when the backend holds an in-memory cube of the
+current data version (see cube.py) it answers the read instead of SQL, with
+the same columns.
+"""
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+
+ALL_INDIA = "All India"
+
+STATE_COLUMNS = ("Transaction_count, Transaction_amount, Map_transaction_count, Map_transaction_amount, "
+                 "RegisteredUser, AppOpens, Insurance_count, Insurance_amount")
+
+
+def cubed(fn):
+    """Answer ``fn`` from ``db.cube`` when one of the current data version is loaded."""
+    @functools.wraps(fn)
+    def wrapper(db, *args):
+        if getattr(db, "cube", None) is not None:
+            result = db.read_cube(fn.__name__, *args)
+            if result is not None:
+                return result
+        return fn(db, *args)
+    return wrapper
+
+
+@metrics.named
+@cubed
+def states(db):
+    q = "SELECT DISTINCT States FROM aggregated_transaction ORDER BY States"
+    return sorted(db.read_sql(q)["States"].tolist())
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.FETCH_WORKERS, thread_name_prefix="fetch")
+        return _executor
+
+
+def fetch(db, **named):
+    """Run named reads in parallel and return ``{name: DataFrame}``.
+
+    Each value is ``(function, *args)`` and is called as ``function(db, *args)``::
+
+        data = fetch(db, states=(state_quarter, 2024, 1), history=(state_history,))
+    """
+    if len(named) < 2:
+        return {name: fn(db, *args) for name, (fn, *args) in named.items()}
+    # each read runs in a copy of the caller's context, so its timings count towards the caller's page
+    futures = {name: executor().submit(contextvars.copy_context().run, fn, db, *args)
+               for name, (fn, *args) in named.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# PER-QUARTER SLICES
+@metrics.named
+@cubed
+def state_quarter(db, year, quarter):
+    """One row per state with every state x quarter metric (rollup_state_quarter)."""
+    q = """SELECT States, {} FROM rollup_state_quarter
+           WHERE Years = %s AND Quarter = %s""".format(STATE_COLUMNS)
+    return db.read_sql(q, params=(year, quarter))
+
+
+@metrics.named
+@cubed
+def types_by_state(db, year, quarter):
+    """Transaction count and amount per (state, Transaction_type)."""
+    q = """SELECT States, Transaction_type, Transaction_count, Transaction_amount
+           FROM aggregated_transaction
+           WHERE Years = %s AND Quarter = %s"""
+    return db.read_sql(q, params=(year, quarter))
+
+
+@metrics.named
+@cubed
+def brands_by_state(db, year, quarter):
+    q = """SELECT States, Brands, Transaction_count
+           FROM aggregated_user
+           WHERE Years = %s AND Quarter = %s"""
+    return db.read_sql(q, params=(year, quarter))
+
+
+@metrics.named
+@cubed
+def districts(db, year, quarter):
+    """Districts with their precomputed in-state and all-India ranks."""
+    q = """SELECT States, District, Transaction_count, Transaction_amount, State_rank, India_rank
+           FROM rollup_district_quarter
+           WHERE Years = %s AND Quarter = %s"""
+    return db.read_sql(q, params=(year, quarter))
+
+
+@metrics.named
+@cubed
+def top_pincodes(db, year, quarter):
+    """Each state's top pincodes by transaction amount (top_transaction)."""
+    q = """SELECT States, Pincodes, Transaction_count, Transaction_amount
+           FROM top_transaction
+           WHERE Years = %s AND Quarter = %s"""
+    return db.read_sql(q, params=(year, quarter))
+
+
+@metrics.named
+@cubed
+def top_insurance_by_state(db, year, quarter):
+    q = """SELECT States, SUM(Transaction_count) AS Transaction_count
+           FROM top_insurance
+           WHERE Years = %s AND Quarter = %s
+           GROUP BY States"""
+    return db.read_sql(q, params=(year, quarter))
+
+
+# FULL HISTORIES (small: one row per state, brand or quarter and period)
+@metrics.named
+@cubed
+def state_history(db):
+    q = """SELECT Years, Quarter, States, {} FROM rollup_state_quarter
+           ORDER BY Years, Quarter""".format(STATE_COLUMNS)
+    return db.read_sql(q)
+
+
+@metrics.named
+@cubed
+def brand_history(db):
+    q = """SELECT Years, Quarter, States, Brands, Transaction_count
+           FROM aggregated_user
+           ORDER BY Years, Quarter"""
+    return db.read_sql(q)
+
+
+@metrics.named
+@cubed
+def insurance_history(db):
+    q = """SELECT Years, Quarter, SUM(Insurance_count) AS Insurance_count
+           FROM aggregated_insurance
+           GROUP BY Years, Quarter
+           ORDER BY Years, Quarter"""
+    return db.read_sql(q)
+
+
+# DERIVATIONS
+def for_state(df, state, column="States"):
+    """Rows of one state, or everything for "All India"."""
+    return df if state == ALL_INDIA else df[df[column] == state]
+
+
+def totals(df, by, columns):
+    """Sum ``columns`` over states, grouped by ``by`` (e.g. the All-India pie)."""
+    return df.groupby(by, as_index=False, sort=False, observed=True)[list(columns)].sum()
+
+
+def for_region(df, state, by, columns):
+    """All-India totals per ``by`` or one state's own rows - the usual pie/bar input."""
+    by = [by] if isinstance(by, str) else list(by)
+    if state == ALL_INDIA:
+        return totals(df, by, columns)
+    return df.loc[df["States"] == state, by + list(columns)]
+
+
+def period_label(df):
+    return df["Years"].astype(str) + "-Q" + df["Quarter"].astype(str)
+
+
+def trend(history, state, columns, by=()):
+    """Per-quarter series for one state or All India, with a QuarterLabel column."""
+    keys = ["Years", "Quarter"] + list(by)
+    df = totals(for_state(history, state), keys, columns).sort_values(["Years", "Quarter"])
+    df.insert(0, "QuarterLabel", period_label(df))
+    return df.reset_index(drop=True)
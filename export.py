@@ -0,0 +1,180 @@
+"""Render the business case studies in batch to static HTML, PNG and Parquet.
+
+    python export.py --years 2022 2024                       # every quarter, All India, all five case studies
+    python export.py --years 2023 2023 --quarters 1 --states all --case-studies 1 3
+    python export.py --formats html parquet png --workers 8 --out reports
+
+Every (case study, year, quarter, state) is built by reports.py - the same
+reads and figures as the dashboard - and written under
+``<out>/<year>-Q<quarter>/<state>/``:
+
+* ``cs<N>.html``        the case study's sections as one page (plotly.js from its CDN)
+* ``<chart>.png``       each figure as an image (needs kaleido)
+* ``<chart>.parquet``   the frame each figure was drawn from
+
+``<out>/index.html`` links every page.
+
+The data version is pinned when the export starts: its Arrow snapshot is
+published if it is not on disk yet (see snapshot.py), and every worker process
+memory-maps that one snapshot into a cube.Cube, so all reads are answered in
+memory from the same pages and the export is consistent even if a load runs
+meanwhile.  Tasks are handed out in (period, state) order, so a worker reuses
+its cached rankings, series and figures for neighbouring tasks.
+
+Only the modules behind the pages are imported; Streamlit is not.
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import cube
+import data_access as da
+import geo
+import reports
+import snapshot
+from backend import get_backend
+from query_cache import CachedBackend
+
+FORMATS = ("html", "png", "parquet")
+
+# per worker process, set by init_worker
+_db = None
+_resources = None
+_geometry = None
+_out = None
+_formats = ()
+
+
+def slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "-", str(text)).strip("-").lower()
+
+
+def task_dir(year, quarter, state):
+    return os.path.join("{}-Q{}".format(year, quarter), slug(state))
+
+
+def init_worker(backend_name, version, snapshot_dir, maps, out, formats):
+    global _db, _resources, _geometry, _out, _formats
+    # pinned to the exported version: never re-checked, every read from the snapshot's cube
+    _db = CachedBackend(get_backend(backend_name), version_check=float("inf"))
+    _db.version = version
+    _db.cube = cube.Cube.load(_db.backend, version, snapshot_dir)
+    _resources = reports.Resources()
+    _geometry = geo.load(geo.level_for_zoom(geo.MAP_ZOOM)) if maps else geo.EMPTY
+    _out = out
+    _formats = formats
+
+
+def page(title, subtitle, sections):
+    parts = ["<h2>{}</h2>".format(html.escape(title)), "<p>{}</p>".format(html.escape(subtitle))]
+    plotlyjs = "cdn"  # once per page
+    for section in sections:
+        if section.title:
+            parts.append("<h3>{}</h3>".format(html.escape(section.title)))
+        if not section.charts:
+            parts.append("<p><em>{}</em></p>".format(html.escape(section.warning)))
+        for chart in section.charts:
+            parts.append(chart.figure.to_html(full_html=False, include_plotlyjs=plotlyjs))
+            plotlyjs = False
+    return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{}</title></head>\n<body>\n{}\n</body></html>\n'
+            .format(html.escape(title), "\n".join(parts)))
+
+
+def render(task):
+    """Build and write one (case study, year, quarter, state); returns (task, files written, seconds)."""
+    number, year, quarter, state = task
+    start = time.perf_counter()
+    title, build = reports.CASE_STUDIES[number - 1]
+    sections = build(_db, _resources, year, quarter, state, _geometry)
+    directory = os.path.join(_out, task_dir(year, quarter, state))
+    os.makedirs(directory, exist_ok=True)
+    files = 0
+    if "html" in _formats:
+        with open(os.path.join(directory, "cs{}.html".format(number)), "w", encoding="utf-8") as fh:
+            fh.write(page(title, "Q{} {} - {}".format(quarter, year, state), sections))
+        files += 1
+    for section in sections:
+        for chart in section.charts:
+            if "png" in _formats:
+                chart.figure.write_image(os.path.join(directory, chart.name + ".png"))
+                files += 1
+            if "parquet" in _formats:
+                chart.data.to_parquet(os.path.join(directory, chart.name + ".parquet"), index=False)
+                files += 1
+    return task, files, time.perf_counter() - start
+
+
+def write_index(out, tasks):
+    links = ['<li><a href="{}">{} - Q{} {} - {}</a></li>'.format(
+        html.escape("{}/cs{}.html".format(task_dir(year, quarter, state).replace(os.sep, "/"), number)),
+        html.escape(reports.CASE_STUDIES[number - 1][0]), quarter, year, html.escape(state))
+        for number, year, quarter, state in tasks]
+    with open(os.path.join(out, "index.html"), "w", encoding="utf-8") as fh:
+        fh.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Case studies</title></head>\n'
+                 '<body>\n<ul>\n{}\n</ul>\n</body></html>\n'.format("\n".join(links)))
+
+
+def export(tasks, out, formats=("html", "parquet"), workers=None, backend_name=None,
+           snapshot_dir=config.SNAPSHOT_DIR):
+    """Render ``tasks`` ((case study, year, quarter, state) tuples) under ``out`` in worker processes."""
+    backend = get_backend(backend_name)
+    version = backend.data_version()
+    if not os.path.isdir(snapshot.version_dir(snapshot_dir, version)):
+        snapshot.publish(backend, snapshot_dir, version)
+    try:
+        geo.load(geo.level_for_zoom(geo.MAP_ZOOM))  # fetched and simplified once, before the workers read it
+        maps = True
+    except Exception as e:
+        print("India state boundaries are not available ({}); maps are left empty.".format(e))
+        maps = False
+    os.makedirs(out, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    # workers start from a clean interpreter rather than inheriting this process's connections
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker,
+                             initargs=(backend_name, version, snapshot_dir, maps, out, tuple(formats))) as pool:
+        for (number, year, quarter, state), files, seconds in pool.map(
+                render, tasks, chunksize=max(1, len(tasks) // (workers * 4))):
+            print("cs{} {}-Q{} {}: {} files in {:.2f}s".format(number, year, quarter, state, files, seconds))
+    if "html" in formats:
+        write_index(out, tasks)
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the business case studies to static files.")
+    parser.add_argument("--years", type=int, nargs=2, default=(2018, 2024), help="first and last year")
+    parser.add_argument("--quarters", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4])
+    parser.add_argument("--states", nargs="+", default=[da.ALL_INDIA], help='state names, or "all"')
+    parser.add_argument("--case-studies", type=int, nargs="+", default=list(range(1, len(reports.CASE_STUDIES) + 1)),
+                        choices=range(1, len(reports.CASE_STUDIES) + 1))
+    parser.add_argument("--formats", nargs="+", default=["html", "parquet"], choices=FORMATS)
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", default=None, help="mysql or duckdb (default: PHONEPE_BACKEND)")
+    parser.add_argument("--snapshot-dir", default=config.SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    if "png" in args.formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("PNG export needs kaleido (pip install kaleido)")
+    states = args.states
+    if [s.lower() for s in states] == ["all"]:
+        states = [da.ALL_INDIA] + da.states(get_backend(args.backend))
+    tasks = [(number, year, quarter, state)
+             for year in range(args.years[0], args.years[1] + 1) for quarter in args.quarters
+             for state in states for number in args.case_studies]
+    start = time.perf_counter()
+    version = export(tasks, args.out, args.formats, args.workers, args.backend, args.snapshot_dir)
+    print("{} case studies of data version {} in {:.1f}s -> {}".format(
+        len(tasks), version, time.perf_counter() - start, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Process-wide cache of built Plotly figures for the case studies.
+
+Building a figure with plotly.express (grouping, trace per colour, layout) is
+most of the CPU of a case-study rerun, and most reruns are repeat views.
+``figure(db, chart_id, params, build)`` returns the figure built earlier for
+the same chart, parameters and data version, and only calls ``build()`` on a
+miss.  A new data version (see query_cache.py) makes every old key unreachable
+and they age out of the LRU.
+
+Choropleths reference the boundaries by URL (see dashboard.get_geometry), so
+a cached figure holds a few KB of data rather than a copy of the geometry and
+the browser fetches the GeoJSON once for every map.
+
+Cached figures are shared between sessions: treat them as read-only and
+finish ``update_layout`` / ``update_geos`` inside ``build``.
+
+Every call is recorded in metrics.py with its build time (or lookup time on a
+hit) and the figure's JSON size.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+
+
+class FigureCache:
+    def __init__(self, max_entries=config.FIGURE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (Figure, JSON bytes)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def info(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+cache = FigureCache()
+
+
+def geometry_key(geometry):
+    """Part of a cached figure's key that tells which boundaries it was built with."""
+    return geometry if isinstance(geometry, str) else id(geometry)
+
+
+def figure(db, chart_id, params, build):
+    """Figure for ``chart_id`` at ``params`` (e.g. year, quarter, state) and the current data version."""
+    start = time.perf_counter()
+    key = (chart_id, tuple(params), db.version)
+    entry = cache.get(key)
+    if entry is None:
+        fig = build()
+        # the size of what the browser receives, measured once per figure
+        nbytes = len(fig.to_json())
+        cache.put(key, (fig, nbytes))
+    else:
+        fig, nbytes = entry
+    metrics.record("chart", chart_id, time.perf_counter() - start, nbytes=nbytes,
+                   cache="miss" if entry is None else "hit")
+    return fig
@@ -0,0 +1,177 @@
+"""India state boundaries for the maps, kept on disk and pre-simplified.
+
+The source GeoJSON (the jbrobst gist the dashboard always used) is fetched
+once, with a timeout, into ``PHONEPE_GEO_DIR`` and never again.  ``build()``
+then writes one simplified copy per level of ``LEVELS``:
+
+* boundaries are simplified with Douglas-Peucker at the level's tolerance (in
+  degrees) and coordinates are rounded to match, which cuts the payload sent
+  to pydeck / plotly by an order of magnitude at country zoom;
+* if the optional ``topojson`` package is installed the simplification runs on
+  the shared arcs of a quantised TopoJSON topology instead, so neighbouring
+  states keep a common border with no slivers or gaps between them.
+
+``load(level)`` reads a prepared level (building it on first use) and
+``level_for_zoom(zoom)`` picks the coarsest level that still looks right at a
+map zoom.  Ship the directory with the app (or run ``build()`` at deploy time)
+and startup needs no network at all.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+import config
+
+GEOJSON_URL = ("https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/"
+               "e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson")
+FETCH_TIMEOUT = 15
+SOURCE_NAME = "india_states.geojson"
+
+# level -> simplification tolerance in degrees (0 keeps the source geometry)
+LEVELS = {"full": 0, "medium": 0.005, "low": 0.02}
+# minimum map zoom at which each level is used, finest first
+ZOOM_LEVELS = ((7, "full"), (5, "medium"), (0, "low"))
+# zoom of the dashboard's maps (Home and case studies) and of exported reports
+MAP_ZOOM = 4
+
+EMPTY = {"type": "FeatureCollection", "features": []}
+
+
+def level_for_zoom(zoom):
+    for min_zoom, level in ZOOM_LEVELS:
+        if zoom >= min_zoom:
+            return level
+    return ZOOM_LEVELS[-1][1]
+
+
+def level_path(level, directory=config.GEO_DIR):
+    if level == "full":
+        return os.path.join(directory, SOURCE_NAME)
+    return os.path.join(directory, "india_states.{}.geojson".format(level))
+
+
+def level_url(level, base=config.GEO_URL):
+    """URL a browser loads ``level`` from when GEO_DIR is served as static files."""
+    return "{}/{}".format(base.rstrip("/"), os.path.basename(level_path(level)))
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(data, fh, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def fetch(directory=config.GEO_DIR, url=GEOJSON_URL, timeout=FETCH_TIMEOUT):
+    """Download the source GeoJSON unless it is already on disk; return its path."""
+    path = level_path("full", directory)
+    if not os.path.exists(path):
+        import requests
+
+        r = requests.get(url, timeout=timeout)
+        r.raise_for_status()
+        _write_json(path, r.json())
+    return path
+
+
+# SIMPLIFICATION
+def digits_for(tolerance):
+    """Decimal places that keep rounding error well below ``tolerance``."""
+    return max(0, math.ceil(-math.log10(tolerance)) + 1)
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker on an (n, 2) array; the end points are always kept."""
+    pts = np.asarray(points, dtype=float)
+    if len(pts) < 3:
+        return pts
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = pts[end] - pts[start]
+        rel = pts[start + 1:end] - pts[start]
+        norm = math.hypot(seg[0], seg[1])
+        if norm == 0:  # closed ring: distance from the start point
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / norm
+        i = int(dist.argmax())
+        if dist[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return pts[keep]
+
+
+def simplify_ring(ring, tolerance):
+    digits = digits_for(tolerance)
+    simple = np.round(simplify_line(ring, tolerance), digits)
+    if len(simple) < 4:  # collapsed (small island): keep it as it was
+        simple = np.round(np.asarray(ring, dtype=float), digits)
+    return simple.tolist()
+
+
+def round_ring(ring, tolerance):
+    return np.round(np.asarray(ring, dtype=float), digits_for(tolerance)).tolist()
+
+
+def map_rings(geometry, fn, tolerance):
+    """Apply ``fn(ring, tolerance)`` to every ring of a (Multi)Polygon."""
+    if geometry["type"] == "Polygon":
+        coords = [fn(r, tolerance) for r in geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        coords = [[fn(r, tolerance) for r in poly] for poly in geometry["coordinates"]]
+    else:
+        return geometry
+    return {"type": geometry["type"], "coordinates": coords}
+
+
+def simplify(geojson, tolerance):
+    """Simplified copy of a FeatureCollection, using shared arcs when topojson is installed."""
+    if tolerance == 0:
+        return geojson
+    try:
+        import topojson
+    except ImportError:
+        features = [dict(f, geometry=map_rings(f["geometry"], simplify_ring, tolerance))
+                    for f in geojson["features"]]
+        return {"type": "FeatureCollection", "features": features}
+    topo = topojson.Topology(geojson, prequantize=True, toposimplify=tolerance)
+    simple = json.loads(topo.to_geojson())
+    for f in simple["features"]:
+        f["geometry"] = map_rings(f["geometry"], round_ring, tolerance)
+    return simple
+
+
+def build(directory=config.GEO_DIR, levels=LEVELS):
+    """Fetch the source if needed and (re)write every simplified level; return their sizes."""
+    source = _read_json(fetch(directory))
+    sizes = {}
+    for level, tolerance in levels.items():
+        path = level_path(level, directory)
+        if tolerance:
+            _write_json(path, simplify(source, tolerance))
+        sizes[level] = os.path.getsize(path)
+    return sizes
+
+
+def load(level="low", directory=config.GEO_DIR):
+    """FeatureCollection of the India states at ``level``, prepared on first use."""
+    path = level_path(level, directory)
+    if not os.path.exists(path):
+        source = _read_json(fetch(directory))
+        if LEVELS[level]:
+            _write_json(path, simplify(source, LEVELS[level]))
+    return _read_json(path)
@@ -0,0 +1,162 @@
+"""Home page: dashboard filters, the 3D state map and the headline numbers.
+
+``render`` is a fragment, so changing a filter reruns this page only.
+"""
+import pydeck as pdk
+import streamlit as st
+
+import dashboard
+import data_access as da
+import geo
+import maps
+import metrics
+import ranked_list
+
+
+@st.fragment
+def render():
+    db = dashboard.get_connection()
+    states_list = dashboard.get_states(db)
+
+    st.markdown("### Dashboard Filters")
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        data_type = st.selectbox(" Data Type", ["Transactions", "Users"])
+
+    with col2:
+        year = st.selectbox(" Year", list(range(2018, 2025)))
+
+    with col3:
+        quarter = st.selectbox(" Quarter", [1, 2, 3, 4])
+
+    with col4:
+        selected_region = st.selectbox("Region", states_list)
+
+    # GEOJSON INDIA MAP (local, pre-simplified for the zoom, see geo.py)
+    geojson = dashboard.get_geojson()
+
+    # DATA FETCH (derived from the shared per-quarter slices in data_access.py)
+    def get_transaction_summary(year, quarter):
+        df = da.totals(da.types_by_state(db, year, quarter), "Transaction_type",
+                       ["Transaction_count", "Transaction_amount"])
+        return df.rename(columns={"Transaction_count": "Count", "Transaction_amount": "Amount"})
+
+    # top-k lists from rankings kept per quarter (see ranking.py)
+    def get_top_districts(year, quarter, state):
+        df = dashboard.get_ranking(db, "districts", year, quarter).top(10, state)
+        return df[["District", "Transaction_amount"]].rename(columns={"Transaction_amount": "Amount"})
+
+    def get_top_pincodes(year, quarter, state):
+        df = dashboard.get_ranking(db, "pincodes", year, quarter).top(10, state)
+        return df[["Pincodes", "Transaction_amount"]].rename(columns={"Transaction_amount": "Amount"})
+
+    def get_map_data(year, quarter):
+        df = da.state_quarter(db, year, quarter)[["States", "Transaction_amount"]]
+        df = df.rename(columns={"Transaction_amount": "Total"})
+        return dict(zip(df["States"], df["Total"])), df
+
+    def get_statewise_transaction_categories(year, quarter):
+        df = da.types_by_state(db, year, quarter)
+        return df.pivot(index="States", columns="Transaction_type", values="Transaction_amount").fillna(0)
+
+    def get_user_totals(year, quarter):
+        df = da.state_quarter(db, year, quarter)[["States", "RegisteredUser", "AppOpens"]]
+        return df.rename(columns={"RegisteredUser": "Registered", "AppOpens": "Opens"})
+
+    # Fetch this tab's slices concurrently into the shared cache; the getters
+    # above then read them back from it
+    if data_type == "Transactions":
+        da.fetch(db, states=(da.state_quarter, year, quarter), types=(da.types_by_state, year, quarter),
+                 districts=(da.districts, year, quarter), pincodes=(da.top_pincodes, year, quarter))
+
+    # DATA INSERT IN MAP (built once per data type, period and data version, see maps.py)
+    @st.cache_resource(max_entries=64)
+    def get_map_layer_data(data_type, year, quarter, level, version, _geojson):
+        if data_type == maps.TRANSACTIONS:
+            _, state_totals = get_map_data(year, quarter)
+            return maps.layer_data(_geojson, data_type, state_totals=state_totals,
+                                   categories=get_statewise_transaction_categories(year, quarter))
+        return maps.layer_data(_geojson, data_type, users=get_user_totals(year, quarter))
+
+    with metrics.timed("chart", "home_map_layer"):
+        map_layer_data = get_map_layer_data(data_type, year, quarter, geo.level_for_zoom(dashboard.MAP_ZOOM),
+                                            db.version, geojson) if geojson["features"] else geojson
+
+    # STRUCTURING
+    col1, col2 = st.columns([2, 2])
+
+    with col1:
+        st.markdown("#### Map ")
+        view_state = pdk.ViewState(longitude=78.9629, latitude=22.5937, zoom=dashboard.MAP_ZOOM, pitch=40)
+        layer = pdk.Layer(
+            "GeoJsonLayer",
+            data=map_layer_data,
+            pickable=True,
+            extruded=True,
+            filled=True,
+            get_elevation="properties.elevation",
+            elevation_scale=1.5,
+            get_fill_color="[255 - properties.elevation * 2, 100, 200, 180]",
+            auto_highlight=True,
+        )
+        st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip={"text": "{tooltip}"}))
+
+    with col2:
+        st.markdown("#### Transactions" if data_type == "Transactions" else "####  User Insights")
+
+        if data_type == "Transactions":
+            st.markdown("##### Transaction Summary")
+            full_txn_df = get_transaction_summary(year, quarter)
+            total_txn_count = full_txn_df["Count"].sum()
+            total_txn_amount = full_txn_df["Amount"].sum()
+            if selected_region == "All India":
+                st.metric(" Total Transactions", f"{int(total_txn_count):,}")
+                st.metric(" Total Amount", f"₹{int(total_txn_amount):,}")
+            else:
+                state_df = da.for_state(da.state_quarter(db, year, quarter), selected_region)
+                state_count = int(state_df["Transaction_count"].iloc[0]) if not state_df.empty else 0
+                state_amount = state_df["Transaction_amount"].iloc[0] if not state_df.empty else 0
+                st.metric(f" Total Transactions in {selected_region}", f"{int(state_count):,}")
+                st.metric(f" Total Amount in {selected_region}", f"₹{int(state_amount):,}")
+
+            st.markdown("---")
+            col_districts, col_states, col_pins = st.columns(3)
+
+            with col_districts:
+                st.markdown("##### Top 10 Districts")
+                ranked_list.render(get_top_districts(year, quarter, selected_region), "District", "Amount",
+                                   prefix="₹")
+
+            with col_states:
+                st.markdown("#####  Top 10 States")
+                _, state_df = get_map_data(year, quarter)
+                ranked_list.render(state_df.nlargest(10, "Total"), "States", "Total", prefix="₹")
+
+            with col_pins:
+                st.markdown("##### Top 10 Pincodes")
+                ranked_list.render(get_top_pincodes(year, quarter, selected_region), "Pincodes", "Amount",
+                                   prefix="₹")
+
+
+        elif data_type == "Users":
+            st.markdown("##### Total Registered Users & App Opens")
+            df_users = get_user_totals(year, quarter)
+            total_registered = df_users["Registered"].sum()
+            total_opens = df_users["Opens"].sum()
+            st.subheader(" All India Summary")
+            st.metric(" Registered Users", f"{int(total_registered):,}")
+            st.metric(" App Opens", f"{int(total_opens):,}")
+            if selected_region != "All India":
+                state_df = df_users[df_users["States"] == selected_region]
+                if not state_df.empty:
+                    state_reg = int(state_df["Registered"].values[0])
+                    state_open = int(state_df["Opens"].values[0])
+                    st.subheader(f" {selected_region} Summary")
+                    st.metric(" Registered Users", f"{state_reg:,}")
+                    st.metric(" App Opens", f"{state_open:,}")
+                else:
+                    st.warning("No user data available for the selected region.")
+            st.markdown("######  Top 10 States by Total Users")
+            df_top_states = df_users.assign(Total=df_users["Registered"] + df_users["Opens"]).nlargest(10, "Total")
+            ranked_list.render(df_top_states, "States", "Total", suffix=" users")
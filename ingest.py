@@ -0,0 +1,281 @@
+"""Pulse JSON ingestion.
+
+One declarative extractor per dataset replaces the nested os.listdir loops
+of phonepetable.ipynb.  State directories are parsed in a process pool and
+handed back as one columnar DataFrame batch per (table, state), so memory
+stays bounded by the largest state rather than the whole Pulse tree.
+"""
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from config import PULSE_ROOT
+
+#  Mapping to match map's state spelling
+state_name_mapping = {
+    "andaman-&-nicobar-islands": "Andaman & Nicobar",
+    "andhra-pradesh": "Andhra Pradesh",
+    "arunachal-pradesh": "Arunachal Pradesh",
+    "assam": "Assam",
+    "bihar": "Bihar",
+    "chandigarh": "Chandigarh",
+    "chhattisgarh": "Chhattisgarh",
+    "dadra-&-nagar-haveli-&-daman-&-diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "delhi": "NCT of Delhi",
+    "goa": "Goa",
+    "gujarat": "Gujarat",
+    "haryana": "Haryana",
+    "himachal-pradesh": "Himachal Pradesh",
+    "jammu-&-kashmir": "Jammu & Kashmir",
+    "jharkhand": "Jharkhand",
+    "karnataka": "Karnataka",
+    "kerala": "Kerala",
+    "ladakh": "Ladakh",
+    "lakshadweep": "Lakshadweep",
+    "madhya-pradesh": "Madhya Pradesh",
+    "maharashtra": "Maharashtra",
+    "manipur": "Manipur",
+    "meghalaya": "Meghalaya",
+    "mizoram": "Mizoram",
+    "nagaland": "Nagaland",
+    "odisha": "Odisha",
+    "puducherry": "Puducherry",
+    "punjab": "Punjab",
+    "rajasthan": "Rajasthan",
+    "sikkim": "Sikkim",
+    "tamil-nadu": "Tamil Nadu",
+    "telangana": "Telangana",
+    "tripura": "Tripura",
+    "uttar-pradesh": "Uttar Pradesh",
+    "uttarakhand": "Uttarakhand",
+    "west-bengal": "West Bengal"
+}
+
+KEY_COLUMNS = ("States", "Years", "Quarter")
+
+# path:    directory under pulse/data holding country/india/state/<state>/<year>/<q>.json
+# records: key under D['data'] holding the list of rows
+# items:   records is a {name: {...}} mapping rather than a list
+# columns: output columns after States/Years/Quarter
+# fields:  lookup path inside each record for every output column
+Extractor = namedtuple("Extractor", ["path", "records", "items", "columns", "fields"])
+
+EXTRACTORS = {
+    "aggregated_insurance": Extractor(
+        path=("aggregated", "insurance"),
+        records="transactionData",
+        items=False,
+        columns=("Insurance_type", "Insurance_count", "Insurance_amount"),
+        fields=(("name",), ("paymentInstruments", 0, "count"), ("paymentInstruments", 0, "amount")),
+    ),
+    "aggregated_transaction": Extractor(
+        path=("aggregated", "transaction"),
+        records="transactionData",
+        items=False,
+        columns=("Transaction_type", "Transaction_count", "Transaction_amount"),
+        fields=(("name",), ("paymentInstruments", 0, "count"), ("paymentInstruments", 0, "amount")),
+    ),
+    "aggregated_user": Extractor(
+        path=("aggregated", "user"),
+        records="usersByDevice",
+        items=False,
+        columns=("Brands", "Transaction_count", "Percentage"),
+        fields=(("brand",), ("count",), ("percentage",)),
+    ),
+    "map_insurance": Extractor(
+        path=("map", "insurance", "hover"),
+        records="hoverDataList",
+        items=False,
+        columns=("District", "Transaction_count", "Transaction_amount"),
+        fields=(("name",), ("metric", 0, "count"), ("metric", 0, "amount")),
+    ),
+    "map_transaction": Extractor(
+        path=("map", "transaction", "hover"),
+        records="hoverDataList",
+        items=False,
+        columns=("District", "Transaction_count", "Transaction_amount"),
+        fields=(("name",), ("metric", 0, "count"), ("metric", 0, "amount")),
+    ),
+    "map_user": Extractor(
+        path=("map", "user", "hover"),
+        records="hoverData",
+        items=True,
+        columns=("District", "RegisteredUser", "AppOpens"),
+        fields=(("name",), ("registeredUsers",), ("appOpens",)),
+    ),
+    "top_insurance": Extractor(
+        path=("top", "insurance"),
+        records="pincodes",
+        items=False,
+        columns=("Pincodes", "Transaction_count", "Transaction_amount"),
+        fields=(("entityName",), ("metric", "count"), ("metric", "amount")),
+    ),
+    "top_transaction": Extractor(
+        path=("top", "transaction"),
+        records="pincodes",
+        items=False,
+        columns=("Pincodes", "Transaction_count", "Transaction_amount"),
+        fields=(("entityName",), ("metric", "count"), ("metric", "amount")),
+    ),
+    "top_user": Extractor(
+        path=("top", "user"),
+        records="pincodes",
+        items=False,
+        columns=("Pincodes", "RegisteredUser"),
+        fields=(("name",), ("registeredUsers",)),
+    ),
+}
+
+
+def table_columns(table):
+    return KEY_COLUMNS + EXTRACTORS[table].columns
+
+
+def state_root(table, root=PULSE_ROOT):
+    return os.path.join(root, *EXTRACTORS[table].path, "country", "india", "state")
+
+
+def list_states(table, root=PULSE_ROOT):
+    base = state_root(table, root)
+    if not os.path.isdir(base):
+        return []
+    return sorted(d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)))
+
+
+def iter_files(table, state, root=PULSE_ROOT):
+    """Yield (year, quarter, path) for every quarter file of one state directory."""
+    base = os.path.join(state_root(table, root), state)
+    for year in sorted(os.listdir(base)):
+        year_dir = os.path.join(base, year)
+        if not year.isdigit() or not os.path.isdir(year_dir):
+            continue
+        for name in sorted(os.listdir(year_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext == ".json" and stem.isdigit():
+                yield int(year), int(stem), os.path.join(year_dir, name)
+
+
+def _lookup(record, field):
+    for key in field:
+        record = record[key]
+    return record
+
+
+def parse_file(table, path):
+    """Return the extractor's value columns for one JSON file as lists."""
+    spec = EXTRACTORS[table]
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh).get("data") or {}
+
+    records = data.get(spec.records) or []
+    if spec.items:
+        records = [dict(value, name=key) for key, value in records.items()]
+
+    out = [[] for _ in spec.columns]
+    for record in records:
+        try:
+            values = [_lookup(record, field) for field in spec.fields]
+        except (KeyError, IndexError, TypeError):
+            continue
+        for column, value in zip(out, values):
+            column.append(value)
+    return out
+
+
+def extract_state(table, state, root=PULSE_ROOT, files=None):
+    """Parse one state directory into a single columnar DataFrame batch."""
+    spec = EXTRACTORS[table]
+    state_name = state_name_mapping.get(state, state)
+    if files is None:
+        files = iter_files(table, state, root)
+
+    years, quarters, columns = [], [], [[] for _ in spec.columns]
+    for year, quarter, path in files:
+        parsed = parse_file(table, path)
+        n = len(parsed[0])
+        years.extend([year] * n)
+        quarters.extend([quarter] * n)
+        for column, values in zip(columns, parsed):
+            column.extend(values)
+
+    batch = {"States": [state_name] * len(years), "Years": years, "Quarter": quarters}
+    batch.update(zip(spec.columns, columns))
+    return pd.DataFrame(batch, columns=list(table_columns(table)))
+
+
+def _extract_task(task):
+    table, state, root, files = task
+    return extract_state(table, state, root, files)
+
+
+def iter_tasks(tables=None, root=PULSE_ROOT):
+    for table in tables or EXTRACTORS:
+        for state in list_states(table, root):
+            yield table, state, root, None
+
+
+def iter_changed_tasks(manifest, tables=None, root=PULSE_ROOT):
+    """Like iter_tasks, but only for files the manifest has not seen in this form."""
+    for table in tables or EXTRACTORS:
+        for state in list_states(table, root):
+            files = [f for f in iter_files(table, state, root) if manifest.changed(f[2])]
+            if files:
+                yield table, state, root, files
+
+
+def run_tasks(tasks, workers=None):
+    """Run extract tasks in a process pool, yielding (task, batch) as they finish.
+
+    At most ``2 * workers`` state batches are in flight at once so a slow
+    consumer (e.g. the database loader) never lets results pile up in memory.
+    """
+    tasks = iter(tasks)
+    if workers == 1:
+        for task in tasks:
+            yield task, _extract_task(task)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for task in tasks:
+            pending[pool.submit(_extract_task, task)] = task
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        for future, task in pending.items():
+            yield task, future.result()
+
+
+def iter_batches(tables=None, root=PULSE_ROOT, workers=None):
+    """Yield (table, DataFrame) batches, one per table and state directory."""
+    for task, batch in run_tasks(iter_tasks(tables, root), workers):
+        yield task[0], batch
+
+
+def iter_changed(manifest, tables=None, root=PULSE_ROOT, workers=None):
+    """Yield (table, state, files, batch) for new or modified quarter files only.
+
+    ``files`` is the list of (year, quarter, path) the batch was built from, so
+    the caller can replace exactly those partitions and record them afterwards.
+    """
+    for task, batch in run_tasks(iter_changed_tasks(manifest, tables, root), workers):
+        table, state, _, files = task
+        yield table, state_name_mapping.get(state, state), files, batch
+
+
+def extract_all(tables=None, root=PULSE_ROOT, workers=None):
+    """Collect every batch into one DataFrame per table (for notebook use)."""
+    parts = {table: [] for table in tables or EXTRACTORS}
+    for table, batch in iter_batches(tables, root, workers):
+        if not batch.empty:
+            parts[table].append(batch)
+    return {
+        table: pd.concat(frames, ignore_index=True) if frames
+        else pd.DataFrame(columns=list(table_columns(table)))
+        for table, frames in parts.items()
+    }
@@ -0,0 +1,231 @@
+"""Load extracted Pulse batches into MySQL.
+
+``refresh`` is the entry point used by phonepetable.ipynb: it asks the
+manifest which quarter files are new or modified, re-parses only those and
+replaces their (States, Years, Quarter) partitions, so re-running a refresh
+never duplicates rows.
+
+Rows go in through ``LOAD DATA LOCAL INFILE`` from a temporary CSV when the
+connection allows it (``allow_local_infile=True`` for mysql.connector,
+``local_infile=True`` for PyMySQL) and through multi-row ``INSERT ... VALUES``
+statements of ``CHUNK_ROWS`` rows otherwise.
+
+``refresh_parquet`` does the same for the embedded DuckDB backend, keeping one
+Parquet file per (table, state) under ``PHONEPE_PARQUET_DIR``.
+"""
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+
+import ingest
+import rollups
+import schema
+import snapshot
+from backend import DuckDBBackend, bump_parquet_version, get_backend
+from config import PARQUET_DIR
+from manifest import Manifest, MANIFEST_PATH
+
+CHUNK_ROWS = 5000
+
+# MySQL error codes raised when LOCAL INFILE is disabled on the client or server
+LOCAL_INFILE_DISABLED = (1148, 2068, 3948)
+
+
+def iter_chunks(batch, chunk_rows=CHUNK_ROWS):
+    """Yield row tuples ``chunk_rows`` at a time with NaN mapped to NULL."""
+    for start in range(0, len(batch), chunk_rows):
+        chunk = batch.iloc[start:start + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield list(chunk.itertuples(index=False, name=None))
+
+
+def insert_values(cursor, table, batch, chunk_rows=CHUNK_ROWS):
+    """Multi-row INSERT ... VALUES, one statement per chunk."""
+    columns = ingest.table_columns(table)
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    prefix = "INSERT INTO {} ({}) VALUES ".format(table, ", ".join(columns))
+    for rows in iter_chunks(batch, chunk_rows):
+        params = [value for r in rows for value in r]
+        cursor.execute(prefix + ", ".join([row] * len(rows)), params)
+
+
+def insert_infile(cursor, table, batch):
+    """LOAD DATA LOCAL INFILE from a temporary CSV of the batch."""
+    columns = ingest.table_columns(table)
+    fd, path = tempfile.mkstemp(suffix=".csv", prefix=table + "_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+            batch.to_csv(fh, header=False, index=False, na_rep="\\N", lineterminator="\n")
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE '{}' INTO TABLE {} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' ({})".format(
+                path.replace("\\", "/"), table, ", ".join(columns)))
+    finally:
+        os.remove(path)
+
+
+def _infile_disabled(exc):
+    code = getattr(exc, "errno", None)
+    if code is None and exc.args and isinstance(exc.args[0], int):
+        code = exc.args[0]  # PyMySQL puts the error code first
+    return code in LOCAL_INFILE_DISABLED
+
+
+class Loader:
+    """Base for partition loaders; keeps per-table rows and seconds in ``stats``."""
+
+    def __init__(self):
+        self.stats = {}
+
+    def record(self, table, rows, seconds):
+        stat = self.stats.setdefault(table, {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0})
+        stat["rows"] += rows
+        stat["seconds"] += seconds
+        if stat["seconds"] > 0:
+            stat["rows_per_sec"] = round(stat["rows"] / stat["seconds"], 1)
+
+
+class BulkLoader(Loader):
+    """Loads batches into MySQL with the fastest method the connection supports.
+
+    ``method`` is "auto" (try LOAD DATA, fall back to VALUES for good once the
+    server refuses it), "infile" or "values".
+    """
+
+    def __init__(self, conn, method="auto", chunk_rows=CHUNK_ROWS):
+        super().__init__()
+        self.conn = conn
+        self.method = method
+        self.chunk_rows = chunk_rows
+
+    def insert(self, cursor, table, batch):
+        if self.method in ("auto", "infile"):
+            try:
+                insert_infile(cursor, table, batch)
+                return
+            except Exception as exc:
+                if self.method == "infile" or not _infile_disabled(exc):
+                    raise
+                self.method = "values"
+        insert_values(cursor, table, batch, self.chunk_rows)
+
+    def replace_partitions(self, table, state, files, batch):
+        """Atomically swap the (state, year, quarter) partitions covered by ``files``."""
+        start = time.perf_counter()
+        # LOAD DATA would store them as '' with a warning (see schema.py)
+        unknown = schema.unknown_values(table, batch)
+        if unknown:
+            raise ValueError("{} ({}): values outside the schema's ENUMs: {}".format(table, state, unknown))
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("START TRANSACTION")
+            for year, quarter in sorted({(y, q) for y, q, _ in files}):
+                cursor.execute(
+                    "DELETE FROM {} WHERE States = %s AND Years = %s AND Quarter = %s".format(table),
+                    (state, year, quarter))
+            if not batch.empty:
+                self.insert(cursor, table, batch)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.record(table, len(batch), time.perf_counter() - start)
+
+
+class ParquetLoader(Loader):
+    """Keeps ``<directory>/<table>/<state>.parquet`` in step with the Pulse files."""
+
+    def __init__(self, directory=PARQUET_DIR):
+        super().__init__()
+        self.directory = directory
+
+    def path(self, table, state):
+        slug = re.sub(r"[^a-z0-9]+", "-", state.lower()).strip("-")
+        return os.path.join(self.directory, table, slug + ".parquet")
+
+    def replace_partitions(self, table, state, files, batch):
+        start = time.perf_counter()
+        path = self.path(table, state)
+        batch = batch.astype(schema.pandas_dtypes(table))
+        if os.path.exists(path):
+            current = pd.read_parquet(path)
+            periods = {(y, q) for y, q, _ in files}
+            keep = [p not in periods for p in zip(current["Years"], current["Quarter"])]
+            batch = pd.concat([current[keep], batch], ignore_index=True)
+
+        if batch.empty:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            batch.sort_values(["Years", "Quarter"]).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        self.record(table, len(batch), time.perf_counter() - start)
+
+
+def _load_changed(loader, manifest, tables, root, workers):
+    """Push every new/changed state batch through ``loader``; returns the periods touched."""
+    periods = set()
+    for table, state, files, batch in ingest.iter_changed(manifest, tables, root, workers):
+        loader.replace_partitions(table, state, files, batch)
+        periods.update((year, quarter) for year, quarter, _ in files)
+        rows = batch.groupby(["Years", "Quarter"]).size()
+        for year, quarter, path in files:
+            manifest.record(path, table, rows.get((year, quarter), 0))
+        manifest.save()
+    return periods
+
+
+def refresh(conn, root=ingest.PULSE_ROOT, manifest_path=MANIFEST_PATH, tables=None,
+            workers=None, method="auto", partitioned=False, snapshot_dir=None):
+    """Load new/changed quarter files into MySQL.
+
+    Missing tables are created and legacy notebook tables migrated to the
+    managed schema (see schema.py) first, and the rollups (see rollups.py)
+    of every (year, quarter) touched are rebuilt afterwards.  With
+    ``snapshot_dir``, a snapshot of the new version is then published there
+    (see snapshot.py), read through PHONEPE_MYSQL_URL.  Returns
+    {table: {"rows", "seconds", "rows_per_sec"}} for the tables touched.
+    """
+    manifest = Manifest.load(manifest_path, root)
+    cursor = conn.cursor()
+    schema.migrate(cursor, tables, partitioned)
+    cursor.close()
+
+    loader = BulkLoader(conn, method)
+    periods = _load_changed(loader, manifest, tables, root, workers)
+    if periods:
+        rollups.build(conn, periods)
+        cursor = conn.cursor()
+        schema.bump_version(cursor)
+        conn.commit()
+        cursor.close()
+        if snapshot_dir:
+            snapshot.publish(get_backend("mysql"), snapshot_dir)
+    return loader.stats
+
+
+def refresh_parquet(directory=PARQUET_DIR, root=ingest.PULSE_ROOT, tables=None, workers=None,
+                    snapshot_dir=None):
+    """Load new/changed quarter files into the Parquet store read by the DuckDB backend.
+
+    The store keeps its own manifest in ``<directory>/_manifest.json``; rollups
+    are computed by the backend when it opens the store or sees ``_version``
+    move.  With ``snapshot_dir``, a snapshot of the new version is published
+    there (see snapshot.py).
+    """
+    manifest = Manifest.load(os.path.join(directory, "_manifest.json"), root)
+    loader = ParquetLoader(directory)
+    if _load_changed(loader, manifest, tables, root, workers):
+        bump_parquet_version(directory)
+        if snapshot_dir:
+            snapshot.publish(DuckDBBackend(directory), snapshot_dir)
+    return loader.stats
+
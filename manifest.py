@@ -0,0 +1,78 @@
+"""File manifest for incremental Pulse ingestion.
+
+Each entry records what was loaded from one JSON file:
+
+    relative path -> {size, mtime, sha1, table, rows}
+
+A file is only re-parsed when its size or mtime moved *and* its content hash
+changed, so a quarterly Pulse drop touches just the new partitions.
+"""
+import hashlib
+import json
+import os
+
+from config import MANIFEST_PATH
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path=MANIFEST_PATH, root=None, entries=None):
+        self.path = path
+        self.root = root
+        self.entries = entries or {}
+        self._hashes = {}
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH, root=None):
+        entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh).get("files", {})
+        return cls(path, root, entries)
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"files": self.entries}, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def key(self, path):
+        return os.path.relpath(path, self.root) if self.root else path
+
+    def changed(self, path):
+        """True when ``path`` has not been loaded in its current form."""
+        entry = self.entries.get(self.key(path))
+        st = os.stat(path)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            return False
+        digest = file_hash(path)
+        self._hashes[path] = digest
+        if entry and entry["sha1"] == digest:
+            # touched but identical: refresh the stat so we skip hashing next time
+            entry["size"], entry["mtime"] = st.st_size, st.st_mtime
+            return False
+        return True
+
+    def record(self, path, table, rows):
+        st = os.stat(path)
+        digest = self._hashes.pop(path, None) or file_hash(path)
+        self.entries[self.key(path)] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha1": digest,
+            "table": table,
+            "rows": int(rows),
+        }
+
+    def rows(self, table=None):
+        return sum(e["rows"] for e in self.entries.values() if table in (None, e["table"]))
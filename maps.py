@@ -0,0 +1,71 @@
+"""Data for the Home tab's 3D state map.
+
+The pydeck GeoJsonLayer reads ``properties.elevation`` and
+``properties.tooltip`` from every feature.  ``layer_data`` computes both for
+all states at once - state values, the transaction-type pivot and user totals
+are merged onto the feature order in one join and the tooltips are built
+column-wise - and returns a new FeatureCollection.  The boundaries it is given
+(usually cached by Streamlit) are never modified: each feature gets a fresh
+``properties`` dict and shares the original geometry, so the result can be
+cached per (data type, year, quarter) and reused as is.
+"""
+import pandas as pd
+
+TRANSACTIONS = "Transactions"
+USERS = "Users"
+
+
+def feature_states(geojson):
+    """State name (``ST_NM``) of every feature, in feature order."""
+    return pd.DataFrame({"States": [f["properties"]["ST_NM"] for f in geojson["features"]]})
+
+
+def rupees(values):
+    return "₹" + values.map("{:,.0f}".format)
+
+
+def transaction_tooltips(df, categories):
+    """``df`` has States, Total and one amount column per category (NaN if unknown)."""
+    text = df["States"] + "\nTotal: " + rupees(df["Total"])
+    for cat in categories:
+        text = text + "\n" + cat + ": " + rupees(df[cat].fillna(0))
+    fallback = df["States"] + "\nTotal Transactions (₹): " + rupees(df["Total"])
+    known = df[categories].notna().any(axis=1) if categories else pd.Series(False, index=df.index)
+    return text.where(known, fallback)
+
+
+def user_tooltips(df):
+    """``df`` has States, Registered and Opens (NaN for states without user data)."""
+    known = df["Registered"].notna()
+    reg = df["Registered"].fillna(0).astype("int64").map("{:,}".format)
+    opens = df["Opens"].fillna(0).astype("int64").map("{:,}".format)
+    text = df["States"] + "\nRegistered Users: " + reg + "\nApp Opens: " + opens
+    return text.where(known, df["States"] + "\nNo user data available")
+
+
+def layer_data(geojson, data_type, state_totals=None, categories=None, users=None):
+    """FeatureCollection with elevation and tooltip properties for the map layer.
+
+    state_totals  States, Total (transaction amount)       - Transactions
+    categories    States x Transaction_type amount pivot   - Transactions
+    users         States, Registered, Opens                - Users
+    """
+    df = feature_states(geojson)
+    if data_type == TRANSACTIONS:
+        df = df.merge(state_totals[["States", "Total"]], on="States", how="left")
+        df = df.merge(categories, left_on="States", right_index=True, how="left")
+        df["Total"] = df["Total"].fillna(0)
+        peak = df["Total"].max() if len(df) else 0
+        df["elevation"] = df["Total"] / peak * 100 if peak > 0 else df["Total"] * 100.0
+        df["tooltip"] = transaction_tooltips(df, list(categories.columns))
+    else:
+        df = df.merge(users[["States", "Registered", "Opens"]], on="States", how="left")
+        df["elevation"] = 0.0
+        df["tooltip"] = user_tooltips(df)
+
+    features = [
+        {"type": "Feature", "geometry": f["geometry"],
+         "properties": dict(f["properties"], elevation=elevation, tooltip=tooltip)}
+        for f, elevation, tooltip in zip(geojson["features"], df["elevation"].tolist(), df["tooltip"].tolist())
+    ]
+    return {"type": "FeatureCollection", "features": features}
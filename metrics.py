@@ -0,0 +1,182 @@
+"""Timings of the hot path: every named query and chart.
+
+Reads are named after the data_access function that runs them (``@named``)
+and recorded by CachedBackend.read_sql; figures are recorded by
+figures.figure under their chart id.  An event holds the wall time, rows
+returned (queries), cache outcome (``cube``, ``l1``, ``shared`` or ``miss`` for a query,
+``hit`` or ``miss`` for a chart) and payload size in bytes (the DataFrame in
+memory, or the figure's JSON as sent to the browser).
+
+Every event is
+
+* added to per-name totals for the process (``stats``), exported as
+  Prometheus text by ``prometheus()`` and, with PHONEPE_METRICS_FILE, written
+  to that file after every page run (e.g. for node_exporter's textfile
+  collector);
+* logged as one JSON object on the ``metrics`` logger with PHONEPE_METRICS_LOG=1;
+* collected per page run inside ``page_run()``, from which the operations
+  panel shows the slowest items of the current page.
+
+The name and the page run are context variables, so reads that
+data_access.fetch runs on its thread pool are attributed to the page that
+asked for them.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+
+log = logging.getLogger(__name__)
+
+_name = contextvars.ContextVar("metrics_name", default=None)
+_run = contextvars.ContextVar("metrics_run", default=None)
+
+EXPORTED = (
+    # (metric, field, type, help)
+    ("phonepe_calls_total", "count", "counter", "Calls per named query or chart."),
+    ("phonepe_seconds_total", "seconds", "counter", "Wall time per named query or chart."),
+    ("phonepe_max_seconds", "max_seconds", "gauge", "Slowest call per named query or chart."),
+    ("phonepe_rows_total", "rows", "counter", "Rows returned per named query."),
+    ("phonepe_bytes_total", "bytes", "counter", "Payload bytes per named query or chart."),
+    ("phonepe_cache_hits_total", "hits", "counter", "Calls served from a cache."),
+    ("phonepe_cache_misses_total", "misses", "counter", "Calls that missed every cache."),
+)
+
+
+class Stats:
+    def __init__(self):
+        self.items = {}  # (kind, name) -> totals
+        self.lock = threading.Lock()
+
+    def add(self, event):
+        key = (event["kind"], event["name"])
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                item = self.items[key] = dict(count=0, seconds=0.0, max_seconds=0.0, rows=0, bytes=0,
+                                              hits=0, misses=0)
+            item["count"] += 1
+            item["seconds"] += event["seconds"]
+            item["max_seconds"] = max(item["max_seconds"], event["seconds"])
+            item["rows"] += event["rows"] or 0
+            item["bytes"] += event["bytes"] or 0
+            if event["cache"] is not None:
+                item["misses" if event["cache"] == "miss" else "hits"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(item) for key, item in self.items.items()}
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+stats = Stats()
+
+
+# RECORDING
+def named(fn):
+    """Decorator: reads made inside ``fn`` are recorded under its name."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _name.set(fn.__name__)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _name.reset(token)
+    return wrapper
+
+
+def current_name(default="unnamed"):
+    return _name.get() or default
+
+
+def record(kind, name, seconds, rows=None, nbytes=None, cache=None):
+    event = {"kind": kind, "name": name, "seconds": seconds, "rows": rows, "bytes": nbytes, "cache": cache}
+    stats.add(event)
+    run = _run.get()
+    if run is not None:
+        run.append(event)
+    if config.METRICS_LOG:
+        log.info(json.dumps(dict(event, seconds=round(seconds, 6))))
+
+
+@contextlib.contextmanager
+def timed(kind, name):
+    """Record the wall time of a block that has no rows, size or cache outcome of its own."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def page_run():
+    """Collect the events of one page run into the list it yields."""
+    events = []
+    token = _run.set(events)
+    try:
+        yield events
+    finally:
+        _run.reset(token)
+        if config.METRICS_FILE:
+            try:
+                write(config.METRICS_FILE)
+            except OSError as e:  # metrics never break a page
+                log.warning("could not write %s: %s", config.METRICS_FILE, e)
+
+
+# REPORTING
+def slowest(events, n=10):
+    """Per-name totals of ``events``, slowest first."""
+    items = {}
+    for event in events:
+        item = items.setdefault((event["kind"], event["name"]), {
+            "kind": event["kind"], "name": event["name"], "calls": 0, "seconds": 0.0,
+            "rows": 0, "bytes": 0, "cache": []})
+        item["calls"] += 1
+        item["seconds"] += event["seconds"]
+        item["rows"] += event["rows"] or 0
+        item["bytes"] += event["bytes"] or 0
+        if event["cache"] is not None:
+            item["cache"].append(event["cache"])
+    rows = sorted(items.values(), key=lambda item: item["seconds"], reverse=True)[:n]
+    for item in rows:
+        item["seconds"] = round(item["seconds"], 4)
+        item["cache"] = ", ".join(sorted(set(item["cache"])))
+    return rows
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus():
+    """Process totals in the Prometheus text exposition format."""
+    items = sorted(stats.snapshot().items())
+    lines = []
+    for metric, field, metric_type, help_text in EXPORTED:
+        lines.append("# HELP {} {}".format(metric, help_text))
+        lines.append("# TYPE {} {}".format(metric, metric_type))
+        for (kind, name), item in items:
+            lines.append('{}{{kind="{}",name="{}"}} {}'.format(metric, _label(kind), _label(name), item[field]))
+    return "\n".join(lines) + "\n"
+
+
+def write(path):
+    """Write ``prometheus()`` to ``path`` atomically."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(prometheus())
+    os.replace(tmp, path)
@@ -0,0 +1,354 @@
+"""Shared, bounded cache in front of a storage backend.
+
+Every query of the dashboard goes through ``CachedBackend.read_sql``.  Results
+are keyed by data version, whitespace-normalised SQL and params, expire after ``ttl``
+seconds and are evicted least-recently-used once ``max_entries`` or
+``max_bytes`` is exceeded.
+
+Ingestion bumps a data version (``pulse_version`` table / ``_version`` file,
+see load.py); the cache polls it every ``version_check`` seconds and drops
+everything when it moves, so a newly loaded quarter shows up without a
+restart.  ``invalidate()`` does the same on demand and then calls every
+function in ``on_invalidate`` (e.g. warmup.warm_in_background).
+
+With several replicas or worker processes, a shared second level
+(``QUERY_CACHE_SHARED``) lets them reuse each other's results:
+
+* DiskCache  - one Arrow IPC file per result under ``QUERY_CACHE_DIR``, least
+  recently used files evicted past ``QUERY_CACHE_SHARED_MAX_MB``;
+* RedisCache - Arrow IPC bytes in any Redis-protocol server (Redis, Valkey,
+  KeyDB or a local stand-in) at ``QUERY_CACHE_REDIS_URL``; eviction is the
+  server's ``maxmemory-policy allkeys-lru``.
+
+Shared entries are namespaced by data version, so every replica moves to a
+new ingestion batch together and old batches are dropped.  The in-process
+level can then be kept small.
+
+Hits return the cached frame itself, not a copy: it is shared by every
+caller and must be treated as read-only (derive new frames with rename,
+assign, merge ...; never assign columns or modify it in place).
+
+Results are typed once, before they are cached (categoricals, narrow ints,
+no Decimals; see schema.typed).  Every read is timed and recorded with its cache level (see metrics.py).
+Once dashboard.py has loaded an in-memory cube of the current data version,
+data_access reads are answered from it (``read_cube``) without any SQL.
+"""
+import glob
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+import schema
+
+
+def normalise(query):
+    return " ".join(query.split())
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class QueryCache:
+    def __init__(self, ttl=config.QUERY_CACHE_TTL, max_entries=config.QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes=config.QUERY_CACHE_MAX_MB * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, nbytes, DataFrame)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, key):
+        """``(DataFrame, nbytes)`` for ``key``, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[1]
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, df, nbytes=None):
+        nbytes = frame_bytes(df) if nbytes is None else nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (time.monotonic() + self.ttl, nbytes, df)
+            self.nbytes += nbytes
+            while self.entries and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+                self._drop(next(iter(self.entries)))
+
+    def _drop(self, key):
+        _, nbytes, _ = self.entries.pop(key)
+        self.nbytes -= nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def info(self):
+        return {"entries": len(self.entries), "bytes": self.nbytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+def to_arrow(df):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_arrow(data):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def key_hash(key):
+    return hashlib.sha1(repr(key[1:]).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Shared cache in a directory: ``<directory>/<version>/<sha1>.arrow``, LRU by mtime."""
+
+    def __init__(self, directory=config.QUERY_CACHE_DIR, max_bytes=config.QUERY_CACHE_SHARED_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.nbytes = None  # estimate, refreshed whenever the directory is scanned
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, str(key[0]), key_hash(key) + ".arrow")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)  # recency for the LRU
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return from_arrow(data)
+
+    def put(self, key, df):
+        data = to_arrow(df)
+        if len(data) > self.max_bytes:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            if self.nbytes is None or self.nbytes + len(data) > self.max_bytes:
+                self._evict()
+            else:
+                self.nbytes += len(data)
+
+    def _files(self):
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "*", "*.arrow")):
+            try:
+                st = os.stat(path)
+            except OSError:  # evicted by another process
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _evict(self):
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.nbytes = total
+
+    def clear(self):
+        """Drop every version but the newest (the one replicas are moving to)."""
+        if not os.path.isdir(self.directory):
+            return
+        versions = sorted((d for d in os.listdir(self.directory) if d.isdigit()), key=int)
+        for version in versions[:-1]:
+            for path in glob.glob(os.path.join(self.directory, version, "*")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            try:
+                os.rmdir(os.path.join(self.directory, version))
+            except OSError:
+                pass
+        with self.lock:
+            self.nbytes = None
+
+    def info(self):
+        files = self._files()
+        return {"entries": len(files), "bytes": sum(size for _, size, _ in files),
+                "hits": self.hits, "misses": self.misses}
+
+
+class RedisCache:
+    """Shared cache in a Redis-protocol server; keys ``<prefix>:<version>:<sha1>``."""
+
+    def __init__(self, url=config.QUERY_CACHE_REDIS_URL, ttl=config.QUERY_CACHE_TTL, prefix="phonepe"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def name(self, key):
+        return "{}:{}:{}".format(self.prefix, key[0], key_hash(key))
+
+    def get(self, key):
+        data = self.client.get(self.name(key))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return from_arrow(data)
+
+    def put(self, key, df):
+        self.client.set(self.name(key), to_arrow(df), ex=self.ttl)
+
+    def clear(self):
+        """Drop the entries of older versions; the newest stays for the other replicas."""
+        versions = {name.split(b":")[1] for name in self.client.scan_iter(match=self.prefix + ":*", count=1000)}
+        newest = max(versions, key=int, default=None)
+        for version in versions - {newest}:
+            names = list(self.client.scan_iter(match=b"%s:%s:*" % (self.prefix.encode(), version), count=1000))
+            if names:
+                self.client.delete(*names)
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+SHARED_CACHES = {"disk": DiskCache, "redis": RedisCache}
+
+
+def get_shared_cache(name=None):
+    """Second-level cache named by ``QUERY_CACHE_SHARED`` ("" = none, "disk" or "redis")."""
+    name = (config.QUERY_CACHE_SHARED if name is None else name).lower()
+    if not name:
+        return None
+    if name not in SHARED_CACHES:
+        raise ValueError("Unknown QUERY_CACHE_SHARED {!r}; expected one of {}".format(
+            name, ", ".join(SHARED_CACHES)))
+    return SHARED_CACHES[name]()
+
+
+class CachedBackend:
+    """Wraps a backend from backend.py with a QueryCache (and optionally a shared
+    second level from ``get_shared_cache``); same read_sql signature."""
+
+    def __init__(self, backend, cache=None, shared=None, version_check=config.QUERY_CACHE_VERSION_CHECK):
+        self.backend = backend
+        self.name = backend.name
+        self.cache = cache or QueryCache()
+        self.shared = shared
+        self.version_check = version_check
+        self.version = backend.data_version()
+        self.checked_at = time.monotonic()
+        self.version_lock = threading.Lock()
+        self.on_invalidate = []
+        self.cube = None  # in-memory copy of the data, see cube.py
+
+    def _check_version(self):
+        if time.monotonic() - self.checked_at < self.version_check:
+            return
+        with self.version_lock:
+            if time.monotonic() - self.checked_at < self.version_check:
+                return
+            version = self.backend.data_version()
+            if version != self.version:
+                self.invalidate(version)
+            self.checked_at = time.monotonic()
+
+    def invalidate(self, version=None):
+        """Forget every cached result (and let the backend reload derived data)."""
+        if hasattr(self.backend, "reload"):
+            self.backend.reload()
+        self.cache.clear()
+        self.version = self.backend.data_version() if version is None else version
+        if self.shared is not None:
+            self.shared.clear()
+        for callback in self.on_invalidate:
+            callback()
+
+    def read_cube(self, name, *args):
+        """``self.cube.<name>(*args)``, or None while there is no cube of the current version.
+
+        Results are kept in the in-process cache like SQL results, under a
+        ``"cube:<name>"`` key, so a repeated read is a lookup.
+        """
+        start = time.perf_counter()
+        self._check_version()
+        cube = self.cube
+        if cube is None or cube.version != self.version:
+            return None
+        key = (self.version, "cube:" + name, args)
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            (result, nbytes), level = entry, "l1"
+        else:
+            result = getattr(cube, name)(*args)
+            nbytes = frame_bytes(result) if hasattr(result, "memory_usage") else 0
+            self.cache.put(key, result, nbytes)
+            level = "cube"
+        metrics.record("query", metrics.current_name(), time.perf_counter() - start, rows=len(result),
+                       nbytes=nbytes, cache=level)
+        return result
+
+    def read_sql(self, query, params=None):
+        start = time.perf_counter()
+        self._check_version()
+        key = (self.version, normalise(query), tuple(params or ()))
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            (df, nbytes), level = entry, "l1"
+        else:
+            df = self.shared.get(key) if self.shared is not None else None
+            level = "shared"
+            if df is None:
+                df = schema.typed(self.backend.read_sql(query, params))
+                level = "miss"
+                if self.shared is not None:
+                    self.shared.put(key, df)
+            nbytes = frame_bytes(df)
+            self.cache.put(key, df, nbytes)
+        metrics.record("query", metrics.current_name(), time.perf_counter() - start,
+                       rows=len(df), nbytes=nbytes, cache=level)
+        return df
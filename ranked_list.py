@@ -0,0 +1,33 @@
+"""Ranked "Top 10" lists on the Home tab, one markdown element per list.
+
+``markdown(df, label, value)`` formats the whole value column at once -
+rounded to whole numbers and grouped the Indian way (1,23,45,678: thousands,
+then lakhs and crores in pairs of digits) - and joins the rows into a single
+markdown bullet list.  ``render`` sends it as one element, rather than one
+``st.markdown`` (and one message to the browser) per row.
+
+The frames passed in usually come from the caches (see ranking.py,
+query_cache.py) and are only read, never modified.
+"""
+import numpy as np
+import streamlit as st
+
+# a digit followed by three digits plus whole pairs up to the end takes a comma after it
+INDIAN_GROUPS = r"(\d)(?=(?:\d\d)*\d{3}$)"
+
+
+def indian(values):
+    """Whole-number strings with Indian digit grouping, e.g. 12345678 -> "1,23,45,678"."""
+    numbers = np.rint(values.astype("float64").fillna(0)).astype("int64")
+    digits = numbers.abs().astype(str).str.replace(INDIAN_GROUPS, r"\1,", regex=True)
+    return digits.where(numbers >= 0, "-" + digits)
+
+
+def markdown(df, label, value, prefix="", suffix=""):
+    """``df`` as a markdown list of "**label** : prefix value suffix", in row order."""
+    text = ("- **" + df[label].astype(str) + "** : " + prefix + indian(df[value]) + suffix)
+    return "\n".join(text.tolist())
+
+
+def render(df, label, value, prefix="", suffix=""):
+    st.markdown(markdown(df, label, value, prefix, suffix))
@@ -0,0 +1,68 @@
+"""Top-k lists per (year, quarter) and per (year, quarter, state).
+
+A ``Ranking`` sorts one per-quarter slice once - districts, top_transaction
+pincodes or device brands - and keeps the row positions in rank order for All
+India and for every state.  ``top(k, state)`` is then a slice of at most k
+positions and one ``take``, with no scan, grouping or sort of the quarter per
+call.
+
+Rows are keyed by (state, item), so same-named districts of different states
+stay apart.  Districts come with the State_rank / India_rank that
+rollups.district_quarter_sql stored, and their order is taken from those
+ranks; pincodes and brands have none and are sorted here, ties broken by
+state and item name.  With ``total`` the All-India list ranks items summed
+over states (a brand's national count) instead of (state, item) rows.
+
+dashboard.get_ranking builds one per slice, period and data version and shares
+it between sessions; ``top`` returns copies.
+"""
+import numpy as np
+
+import data_access as da
+
+# name -> (per-quarter read, ranked column, item column, All India sums over states,
+#          stored (in-state, All India) rank columns or None)
+RANKINGS = {
+    "districts": (da.districts, "Transaction_amount", "District", False, ("State_rank", "India_rank")),
+    "pincodes": (da.top_pincodes, "Transaction_amount", "Pincodes", False, None),
+    "brands": (da.brands_by_state, "Transaction_count", "Brands", True, None),
+}
+
+
+class Ranking:
+    def __init__(self, df, value, item, total=False, state_column="States", ranks=None):
+        self.value = value
+        self.item = item
+        if ranks is not None:
+            state_rank, india_rank = ranks
+            self.rows = df.take(np.argsort(df[india_rank].to_numpy(), kind="stable")).reset_index(drop=True)
+            order = self.rows[state_rank].to_numpy()
+            self.positions = {state: positions[np.argsort(order[positions], kind="stable")]
+                              for state, positions in
+                              self.rows.groupby(state_column, sort=False, observed=True).indices.items()}
+        else:
+            self.rows = df.sort_values([value, state_column, item], ascending=[False, True, True],
+                                       kind="mergesort").reset_index(drop=True)
+            # positions come out ascending, i.e. in rank order within each state
+            self.positions = self.rows.groupby(state_column, sort=False, observed=True).indices
+        if total:
+            columns = [c for c in self.rows.columns if c not in (state_column, item)]
+            self.india = (da.totals(self.rows, item, columns)
+                          .sort_values([value, item], ascending=[False, True], kind="mergesort")
+                          .reset_index(drop=True))
+        else:
+            self.india = self.rows
+
+    def top(self, k, state=da.ALL_INDIA):
+        """The ``k`` highest-ranked rows of All India or of one state."""
+        if state == da.ALL_INDIA:
+            return self.india.iloc[:k].copy()
+        positions = self.positions.get(state)
+        if positions is None:
+            return self.rows.iloc[:0].copy()
+        return self.rows.take(positions[:k])
+
+
+def build(db, name, year, quarter):
+    read, value, item, total, ranks = RANKINGS[name]
+    return Ranking(read(db, year, quarter), value, item, total=total, ranks=ranks)
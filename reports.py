@@ -0,0 +1,405 @@
+"""The five business case studies as data: sections of titled Plotly figures.
+
+``case_study_1`` ... ``case_study_5`` take a backend, a year, quarter and state
+and the boundaries for the choropleths, run the reads of data_access.py and
+build every figure through figures.figure.  They return a list of
+``Section``s - a heading, the charts (with the frame each was drawn from) or
+the warning shown when there is nothing to draw.
+
+case_studies.py lays the sections out on the Streamlit page and export.py
+writes them to HTML/PNG/Parquet in batch, so both show the same numbers and
+charts.  Nothing here imports Streamlit.
+
+``resources`` gives the per-process shared data: ``get_series(db)`` (see
+timeseries.py) and ``get_ranking(db, name, year, quarter)`` (see ranking.py).
+The dashboard passes the ``dashboard`` module, which caches them with
+``st.cache_resource``; export.py passes a ``Resources``.
+"""
+from collections import namedtuple
+
+import plotly.express as px
+
+import data_access as da
+import figures
+import ranking
+import timeseries
+
+Section = namedtuple("Section", "title charts warning")
+Chart = namedtuple("Chart", "name figure data")
+
+
+class Resources:
+    """``get_series`` / ``get_ranking`` for one process, kept per data version."""
+
+    def __init__(self):
+        self.series = {}
+        self.rankings = {}
+
+    def get_series(self, db):
+        if db.version not in self.series:
+            self.series = {db.version: timeseries.StateSeries.from_history(da.state_history(db))}
+        return self.series[db.version]
+
+    def get_ranking(self, db, name, year, quarter):
+        key = (name, year, quarter, db.version)
+        if key not in self.rankings:
+            self.rankings[key] = ranking.build(db, name, year, quarter)
+        return self.rankings[key]
+
+
+def section(title, *charts, warning=None):
+    """A Section of ``(name, figure, data)`` charts; with ``warning`` and no charts, the message instead."""
+    return Section(title, [Chart(*chart) for chart in charts], warning)
+
+
+# CASE STUDY 1
+def case_study_1(db, resources, selected_year, selected_quarter, selected_state, geometry):
+    data = da.fetch(db, states=(da.state_quarter, selected_year, selected_quarter),
+                    types=(da.types_by_state, selected_year, selected_quarter))
+    state_df, types_df = data["states"], data["types"]
+    sections = []
+
+    # Choropleth Map
+    map_df = state_df[["States", "Transaction_amount"]].rename(columns={"Transaction_amount": "TotalAmount"})
+
+    fig_map = figures.figure(db, "cs1_map", (selected_year, selected_quarter, figures.geometry_key(geometry)), lambda: px.choropleth(
+        map_df,
+        geojson=geometry,
+        featureidkey="properties.ST_NM",
+        locations="States",
+        color="TotalAmount",
+        color_continuous_scale="Turbo",
+        title=f"Total Transaction Amount by State (Q{selected_quarter}, {selected_year})"
+    ).update_geos(fitbounds="locations", visible=False))
+    sections.append(section(None, ("cs1_map", fig_map, map_df)))
+
+    # Payment Pie Charts
+    pie_df = da.for_region(types_df, selected_state, "Transaction_type",
+                           ["Transaction_count", "Transaction_amount"])
+    pie_df = pie_df.rename(columns={"Transaction_count": "TotalCount", "Transaction_amount": "TotalAmount"})
+
+    fig_pie1 = figures.figure(db, "cs1_pie1", (selected_year, selected_quarter, selected_state), lambda: px.pie(
+        pie_df, names="Transaction_type", values="TotalCount", title="Transaction Count by Payment Method"))
+    fig_pie2 = figures.figure(db, "cs1_pie2", (selected_year, selected_quarter, selected_state), lambda: px.pie(
+        pie_df, names="Transaction_type", values="TotalAmount", title="Transaction Amount by Payment Method"))
+    sections.append(section("Payment Method Popularity", ("cs1_pie1", fig_pie1, pie_df), ("cs1_pie2", fig_pie2, pie_df)))
+
+    # Top  States
+    if selected_state == "All India":
+        top_states_df = map_df.sort_values("TotalAmount", ascending=False).head(10)
+    else:
+        top_states_df = map_df[map_df["States"] == selected_state]
+
+    fig_bar = figures.figure(db, "cs1_bar", (selected_year, selected_quarter, selected_state), lambda: px.bar(
+        top_states_df, x="States", y="TotalAmount", color="States", text_auto=".2s", title="Top Transaction States"))
+    sections.append(section("Top  States by Transaction Amount", ("cs1_bar", fig_bar, top_states_df)))
+
+    # Line Chart
+    breakdown_df = da.for_state(types_df, selected_state)[["States", "Transaction_type", "Transaction_amount"]]
+    breakdown_df = breakdown_df.rename(columns={"Transaction_amount": "Amount"})
+
+    title = "Transaction Category Breakdown by State"
+    if not breakdown_df.empty:
+        fig_line = figures.figure(db, "cs1_line", (selected_year, selected_quarter, selected_state), lambda: px.line(
+            breakdown_df,
+            x="Transaction_type",
+            y="Amount",
+            color="States",
+            markers=True,
+            title="Transaction by Payment Category and State"
+        ).update_layout(xaxis_title="Payment Category", yaxis_title="Transaction Amount (₹)", xaxis_tickangle=-30))
+        sections.append(section(title, ("cs1_line", fig_line, breakdown_df)))
+    else:
+        sections.append(section(title, warning="No transaction data found for the selected filters."))
+
+    # Trend Analysis
+    trend_df = resources.get_series(db).trend(selected_state, ["Transaction_amount"])
+    trend_df = trend_df.rename(columns={"Transaction_amount": "TotalAmount"})
+
+    title = "Trend Analysis"
+    if not trend_df.empty:
+        fig_trend = figures.figure(db, "cs1_trend", (selected_state,), lambda: px.bar(
+            trend_df,
+            x="QuarterLabel",
+            y="TotalAmount",
+            text_auto=".2s",
+            color="QuarterLabel",
+            title=f"Transaction Amount Trend per Quarter - {selected_state}"
+        ).update_layout(xaxis_title="Quarter", yaxis_title="Transaction Amount (₹)", xaxis_tickangle=-45, showlegend=False))
+        sections.append(section(title, ("cs1_trend", fig_trend, trend_df)))
+    else:
+        sections.append(section(title, warning="No transaction trend data available for the selected region."))
+    return sections
+
+
+# CASE STUDY 2
+def case_study_2(db, resources, selected_year, selected_quarter, selected_state, geometry):
+    data = da.fetch(db, brands=(da.brands_by_state, selected_year, selected_quarter),
+                    states=(da.state_quarter, selected_year, selected_quarter),
+                    history=(da.brand_history,))
+    sections = []
+
+    # One brand slice serves the top-15 bar (through its ranking) and the market-share pie
+    brand_share_df = da.for_region(data["brands"], selected_state, "Brands", ["Transaction_count"])
+    brand_share_df = brand_share_df.rename(columns={"Transaction_count": "TotalCount"})
+
+    # Device Brands
+    title = "Top  Device Brands by User Count"
+    brand_df = resources.get_ranking(db, "brands", selected_year, selected_quarter).top(15, selected_state)
+    brand_df = brand_df.rename(columns={"Transaction_count": "TotalCount"})
+    if not brand_df.empty:
+        fig_bar = figures.figure(db, "cs2_bar", (selected_year, selected_quarter, selected_state), lambda: px.bar(
+            brand_df,
+            x="Brands",
+            y="TotalCount",
+            color="Brands",
+            text_auto=".2s",
+            title=f"Top  Brands - Q{selected_quarter} {selected_year} ({selected_state})"
+        ))
+        sections.append(section(title, ("cs2_bar", fig_bar, brand_df)))
+    else:
+        sections.append(section(title, warning="No brand data available for selected filters."))
+
+    # AppOpens vs Registered Users
+    title = "App Opens vs Registered Users"
+    user_df = da.for_state(data["states"], selected_state)
+    user_df = user_df[["States", "RegisteredUser", "AppOpens"]].rename(
+        columns={"RegisteredUser": "Registered", "AppOpens": "Opens"})
+    if not user_df.empty:
+        fig_scatter = figures.figure(db, "cs2_scatter", (selected_year, selected_quarter, selected_state), lambda: px.scatter(
+            user_df,
+            x="Registered",
+            y="Opens",
+            size="Registered",
+            color="States",
+            hover_name="States",
+            title="User Engagement: App Opens vs Registered Users",
+            labels={"Registered": "Registered Users", "Opens": "App Opens"}
+        ))
+        sections.append(section(title, ("cs2_scatter", fig_scatter, user_df)))
+    else:
+        sections.append(section(title, warning="No user data available for selected filters."))
+
+    # Brand Pie Chart
+    title = "Device Brand Market Share"
+    pie_df = brand_share_df
+    if not pie_df.empty:
+        fig_pie = figures.figure(db, "cs2_pie", (selected_year, selected_quarter, selected_state), lambda: px.pie(
+            pie_df,
+            names="Brands",
+            values="TotalCount",
+            title="Device Brand Market Share",
+        ))
+        sections.append(section(title, ("cs2_pie", fig_pie, pie_df)))
+    else:
+        sections.append(section(title, warning="No brand share data available for selected filters."))
+
+    # Trend Line of Brand Usage
+    title = "Brand Usage Trend Over Quarters"
+    trend_df = da.trend(data["history"], selected_state, ["Transaction_count"], by=["Brands"])
+    trend_df = trend_df.rename(columns={"Transaction_count": "Count"})
+
+    if not trend_df.empty:
+        fig_trend = figures.figure(db, "cs2_trend", (selected_state,), lambda: px.line(
+            trend_df,
+            x="QuarterLabel",
+            y="Count",
+            color="Brands",
+            markers=True,
+            title=f"Quarterly Device Usage Trend - {selected_state}"
+        ).update_layout(xaxis_tickangle=-45))
+        sections.append(section(title, ("cs2_trend", fig_trend, trend_df)))
+    else:
+        sections.append(section(title, warning="No brand trend data available."))
+    return sections
+
+
+# CASE STUDY 3
+def case_study_3(db, resources, cs3_year, cs3_quarter, cs3_state, geometry):
+    data = da.fetch(db, states=(da.state_quarter, cs3_year, cs3_quarter),
+                    top=(da.top_insurance_by_state, cs3_year, cs3_quarter),
+                    history=(da.insurance_history,))
+    state_df = data["states"].rename(columns={"States": "State"})
+    # only states with map_insurance rows, as the map_insurance queries returned
+    # (the rollup holds 0 for a state with no insurance data)
+    state_df = state_df[state_df["Insurance_count"] > 0]
+    sections = []
+
+    # Insurance Transactions Choropleth Map
+    map_df = state_df[["State", "Insurance_count", "Insurance_amount"]].rename(
+        columns={"Insurance_count": "TransactionCount", "Insurance_amount": "TotalAmount"})
+    fig_map = figures.figure(db, "cs3_map", (cs3_year, cs3_quarter, figures.geometry_key(geometry)), lambda: px.choropleth(
+        map_df,
+        geojson=geometry,
+        featureidkey='properties.ST_NM',
+        locations='State',
+        color='TransactionCount',
+        color_continuous_scale='blues',
+        title='Insurance Transactions by State'
+    ).update_geos(fitbounds="locations", visible=False))
+    sections.append(section("Insurance Transactions Across States", ("cs3_map", fig_map, map_df)))
+
+    # Top States by Insurance
+    top_df = data["top"].nlargest(15, "Transaction_count")
+    top_df = top_df.rename(columns={"States": "State", "Transaction_count": "TransactionCount"})
+    fig_bar = figures.figure(db, "cs3_bar", (cs3_year, cs3_quarter), lambda: px.bar(
+        top_df,
+        x='TransactionCount',
+        y='State',
+        orientation='h',
+        color='TransactionCount',
+        title='Top  States by Insurance Transactions'
+    ))
+    sections.append(section("Top  States by Insurance Adoption", ("cs3_bar", fig_bar, top_df)))
+
+    # Quarterly Insurance Trend
+    trend_df = data["history"]
+    trend_df = trend_df[trend_df["Years"] == cs3_year][["Quarter", "Insurance_count"]].rename(
+        columns={"Insurance_count": "TransactionCount"})
+    fig_line = figures.figure(db, "cs3_line", (cs3_year,), lambda: px.line(
+        trend_df,
+        x='Quarter',
+        y='TransactionCount',
+        markers=True,
+        title=f'Quarterly Insurance Trends - {cs3_year}'
+    ))
+    sections.append(section("Quarterly Insurance Transaction Trend", ("cs3_line", fig_line, trend_df)))
+
+    # Insurance vs Registered Users
+    merged_df = state_df[["State", "RegisteredUser", "Insurance_count"]].rename(
+        columns={"RegisteredUser": "RegisteredUsers", "Insurance_count": "InsuranceTransactions"})
+
+    fig_bubble = figures.figure(db, "cs3_bubble", (cs3_year, cs3_quarter), lambda: px.scatter(
+        merged_df,
+        x='RegisteredUsers',
+        y='InsuranceTransactions',
+        size='InsuranceTransactions',
+        color='State',
+        title='Insurance Transactions vs Registered Users by State',
+        labels={
+            'RegisteredUsers': 'Registered Users',
+            'InsuranceTransactions': 'Insurance Transactions'
+        }
+    ))
+    sections.append(section("Insurance vs User Penetration Ratio", ("cs3_bubble", fig_bubble, merged_df)))
+    return sections
+
+
+# CASE STUDY 4
+def case_study_4(db, resources, cs4_year, cs4_quarter, cs4_state, geometry):
+    state_df = da.state_quarter(db, cs4_year, cs4_quarter).rename(columns={"States": "State"})
+    sections = []
+
+    # Choropleth Map
+    map_df = state_df[["State", "Map_transaction_amount"]].rename(columns={"Map_transaction_amount": "TotalAmount"})
+    fig_map = figures.figure(db, "cs4_map", (cs4_year, cs4_quarter, figures.geometry_key(geometry)), lambda: px.choropleth(
+        map_df,
+        geojson=geometry,
+        featureidkey='properties.ST_NM',
+        locations='State',
+        color='TotalAmount',
+        color_continuous_scale='Viridis',
+        title='Total Transaction Amounts by State'
+    ).update_geos(fitbounds="locations", visible=False))
+    sections.append(section("Market Coverage by State (Transaction Amount)", ("cs4_map", fig_map, map_df)))
+
+    #  Pan-India Quarterly Growth Trend
+    trend_df = resources.get_series(db).trend(da.ALL_INDIA, ["Transaction_amount"])
+    trend_df = trend_df.rename(columns={"QuarterLabel": "Period", "Transaction_amount": "TotalAmount"})
+    fig_line = figures.figure(db, "cs4_line", (), lambda: px.line(
+        trend_df,
+        x="Period",
+        y="TotalAmount",
+        markers=True,
+        title="Pan-India Transaction Growth Over Time"
+    ))
+    sections.append(section("Quarterly Transaction Growth Trend (India)", ("cs4_line", fig_line, trend_df)))
+
+    #  Volume vs Count
+    bubble_df = state_df[["State", "Map_transaction_amount", "Map_transaction_count"]].rename(
+        columns={"Map_transaction_amount": "TotalAmount", "Map_transaction_count": "TransactionCount"})
+    fig_bubble = figures.figure(db, "cs4_bubble", (cs4_year, cs4_quarter), lambda: px.scatter(
+        bubble_df,
+        x="TransactionCount",
+        y="TotalAmount",
+        size="TotalAmount",
+        color="State",
+        hover_name="State",
+        title="Market Expansion Opportunities by State",
+        labels={
+            "TransactionCount": "Transaction Count",
+            "TotalAmount": "Transaction Amount"
+        }
+    ))
+    sections.append(section("Market Size vs Frequency (by State)", ("cs4_bubble", fig_bubble, bubble_df)))
+    return sections
+
+
+# CASE STUDY 5
+def case_study_5(db, resources, cs5_year, cs5_quarter, cs5_state, geometry):
+    sections = []
+
+    # Choropleth Map: Registered Users by State
+    state_df = da.state_quarter(db, cs5_year, cs5_quarter).rename(columns={"States": "State"})
+    user_map_df = state_df[["State", "RegisteredUser"]].rename(columns={"RegisteredUser": "TotalRegistered"})
+    fig_map = figures.figure(db, "cs5_map", (cs5_year, cs5_quarter, figures.geometry_key(geometry)), lambda: px.choropleth(
+        user_map_df,
+        geojson=geometry,
+        featureidkey='properties.ST_NM',
+        locations='State',
+        color='TotalRegistered',
+        color_continuous_scale='YlGnBu',
+        title=f"Registered Users by State (Q{cs5_quarter}, {cs5_year})"
+    ).update_geos(fitbounds="locations", visible=False))
+    sections.append(section("Registered Users Distribution", ("cs5_map", fig_map, user_map_df)))
+
+    # App Opens Trend Line
+    trend_df = resources.get_series(db).trend(cs5_state, ["AppOpens"])
+    trend_df = trend_df.rename(columns={"AppOpens": "TotalOpens"})
+    fig_line = figures.figure(db, "cs5_line", (cs5_state,), lambda: px.line(
+        trend_df,
+        x="QuarterLabel",
+        y="TotalOpens",
+        markers=True,
+        title=f"App Opens Over Time - {cs5_state}"
+    ).update_layout(xaxis_title="Quarter", yaxis_title="App Opens"))
+    sections.append(section("App Engagement Trend Over Quarters", ("cs5_line", fig_line, trend_df)))
+
+    # Engagement Ratio per State
+    ratio_df = state_df[["State", "RegisteredUser", "AppOpens"]].rename(
+        columns={"RegisteredUser": "Registered", "AppOpens": "Opens"})
+    ratio_df["EngagementRatio"] = (ratio_df["Opens"] / ratio_df["Registered"]).round(2)
+    top_ratio_df = ratio_df.sort_values("EngagementRatio", ascending=False).head(10)
+    fig_bar = figures.figure(db, "cs5_bar", (cs5_year, cs5_quarter), lambda: px.bar(
+        top_ratio_df,
+        x="State",
+        y="EngagementRatio",
+        color="EngagementRatio",
+        title="Top States by App Opens per Registered User"
+    ))
+    sections.append(section("App Opens to Registered Users Ratio", ("cs5_bar", fig_bar, top_ratio_df)))
+
+    #  Growth Potential
+    bubble_df = ratio_df.copy()
+    fig_bubble = figures.figure(db, "cs5_bubble", (cs5_year, cs5_quarter), lambda: px.scatter(
+        bubble_df,
+        x="Registered",
+        y="Opens",
+        size="EngagementRatio",
+        color="State",
+        hover_name="State",
+        title="User Growth vs Engagement",
+        labels={"Registered": "Registered Users", "Opens": "App Opens"}
+    ))
+    sections.append(section("Growth Strategy: Users vs Engagement", ("cs5_bubble", fig_bubble, bubble_df)))
+    return sections
+
+
+# question -> builder, in the order of the page's selector
+CASE_STUDIES = [
+    ("1. Decoding Transaction Dynamics on PhonePe", case_study_1),
+    ("2. Device Dominance and User Engagement Analysis", case_study_2),
+    ("3. Insurance Penetration and Growth Potential Analysis", case_study_3),
+    ("4. Transaction Analysis for Market Expansion", case_study_4),
+    ("5. User Engagement and Growth Strategy", case_study_5),
+]
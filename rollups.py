@@ -0,0 +1,147 @@
+"""Materialised rollups for the dashboard's per-quarter aggregates.
+
+The Home tab and the case studies only ever need a handful of shapes:
+
+    rollup_state_quarter     state x quarter   (transactions, users, insurance)
+    rollup_district_quarter  state x quarter x District, ranked in state and India
+
+State x type and state x brand need no rollup: aggregated_transaction and
+aggregated_user already hold one row per (Years, Quarter, States, type/brand),
+and the All-India pies, brand lists and trends are summed from those slices
+and from rollup_state_quarter in pandas (see data_access.py).
+
+``build`` recomputes the rollups for the (year, quarter) periods a refresh
+touched, so a cold dashboard render becomes a few primary-key lookups.
+"""
+from schema import KEY_TYPES
+
+STATE_METRICS = (
+    "Transaction_count",       # aggregated_transaction
+    "Transaction_amount",
+    "Map_transaction_count",   # map_transaction
+    "Map_transaction_amount",
+    "RegisteredUser",          # map_user
+    "AppOpens",
+    "Insurance_count",         # map_insurance
+    "Insurance_amount",
+)
+
+# metric columns -> (source table, source columns)
+STATE_SOURCES = [
+    (("Transaction_count", "Transaction_amount"),
+     "aggregated_transaction", ("Transaction_count", "Transaction_amount")),
+    (("Map_transaction_count", "Map_transaction_amount"),
+     "map_transaction", ("Transaction_count", "Transaction_amount")),
+    (("RegisteredUser", "AppOpens"),
+     "map_user", ("RegisteredUser", "AppOpens")),
+    (("Insurance_count", "Insurance_amount"),
+     "map_insurance", ("Transaction_count", "Transaction_amount")),
+]
+
+STATES_TYPE, YEARS_TYPE, QUARTER_TYPE = (t for _, t in KEY_TYPES)
+
+ROLLUP_DDL = {
+    "rollup_state_quarter": """
+        CREATE TABLE IF NOT EXISTS rollup_state_quarter (
+            Years {years},
+            Quarter {quarter},
+            States {states},
+            {metrics},
+            PRIMARY KEY (Years, Quarter, States),
+            KEY idx_state_period (States, Years, Quarter)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    "rollup_district_quarter": """
+        CREATE TABLE IF NOT EXISTS rollup_district_quarter (
+            Years {years},
+            Quarter {quarter},
+            States {states},
+            District VARCHAR(64) NOT NULL,
+            Transaction_count BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            Transaction_amount DOUBLE NOT NULL DEFAULT 0,
+            State_rank SMALLINT UNSIGNED NOT NULL,
+            India_rank SMALLINT UNSIGNED NOT NULL,
+            PRIMARY KEY (Years, Quarter, States, District),
+            KEY idx_india_rank (Years, Quarter, India_rank),
+            KEY idx_state_rank (Years, Quarter, States, State_rank)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+}
+
+ROLLUPS = tuple(ROLLUP_DDL)
+# India-level rollups no page reads any more; dropped where an older build created them
+RETIRED = ("rollup_india_quarter", "rollup_type_quarter", "rollup_brand_quarter")
+
+
+def _metric_columns():
+    return ",\n            ".join(
+        "{} {} NOT NULL DEFAULT 0".format(m, "DOUBLE" if m.endswith("amount") else "BIGINT UNSIGNED")
+        for m in STATE_METRICS)
+
+
+def create_rollups(cursor):
+    for ddl in ROLLUP_DDL.values():
+        cursor.execute(ddl.format(years=YEARS_TYPE, quarter=QUARTER_TYPE, states=STATES_TYPE,
+                                  metrics=_metric_columns()))
+    for table in RETIRED:
+        cursor.execute("DROP TABLE IF EXISTS {}".format(table))
+
+
+def state_quarter_sql(where=""):
+    parts = []
+    for targets, source, columns in STATE_SOURCES:
+        picks = dict(zip(targets, columns))
+        exprs = ", ".join("{} AS {}".format(picks.get(m, 0), m) for m in STATE_METRICS)
+        parts.append("SELECT Years, Quarter, States, {} FROM {}{}".format(exprs, source, where))
+    return (
+        "SELECT Years, Quarter, States, {} FROM ({}) AS src "
+        "GROUP BY Years, Quarter, States".format(
+            ", ".join("SUM({0}) AS {0}".format(m) for m in STATE_METRICS),
+            " UNION ALL ".join(parts)))
+
+
+def district_quarter_sql(where=""):
+    return (
+        "SELECT Years, Quarter, States, District, Transaction_count, Transaction_amount, "
+        "ROW_NUMBER() OVER (PARTITION BY Years, Quarter, States "
+        "ORDER BY Transaction_amount DESC, District) AS State_rank, "
+        "ROW_NUMBER() OVER (PARTITION BY Years, Quarter "
+        "ORDER BY Transaction_amount DESC, States, District) AS India_rank "
+        "FROM map_transaction{}".format(where))
+
+
+# Portable SELECTs (MySQL 8 and DuckDB).  MySQL inserts them per period;
+# DuckDB materialises them once over the Parquet views (see backend.py).
+ROLLUP_SELECT = {
+    "rollup_state_quarter": state_quarter_sql,
+    "rollup_district_quarter": district_quarter_sql,
+}
+
+PERIOD_WHERE = " WHERE Years = %s AND Quarter = %s"
+
+
+def _build_period(cursor, year, quarter):
+    period = (year, quarter)
+    for table in ROLLUPS:
+        cursor.execute("DELETE FROM {} WHERE Years = %s AND Quarter = %s".format(table), period)
+    for table, select in ROLLUP_SELECT.items():
+        sql = select(PERIOD_WHERE)
+        cursor.execute("INSERT INTO {} {}".format(table, sql), period * sql.count(PERIOD_WHERE))
+
+
+def build(conn, periods=None):
+    """Rebuild the rollups for ``periods`` [(year, quarter), ...], or for every period."""
+    cursor = conn.cursor()
+    try:
+        create_rollups(cursor)
+        if periods is None:
+            cursor.execute("SELECT DISTINCT Years, Quarter FROM aggregated_transaction")
+            periods = cursor.fetchall()
+        for year, quarter in sorted(set(periods)):
+            cursor.execute("START TRANSACTION")
+            _build_period(cursor, year, quarter)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return sorted(set(periods))
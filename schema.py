@@ -0,0 +1,296 @@
+"""Managed MySQL schema for the nine Pulse tables.
+
+Every query in phonepe.py filters on ``Years = %s AND Quarter = %s`` (often
+``AND States = %s``) or, for the trend charts, on ``States = %s`` across all
+periods.  Each table therefore gets
+
+* a clustered primary key ``(Years, Quarter, States, <dimension>)`` so one
+  quarter, or one state's quarter, is a contiguous range read, and
+* a secondary ``(States, Years, Quarter)`` index for the per-state trends.
+
+Closed vocabularies (States, Transaction_type) are ENUMs, which MySQL stores
+as 1-byte dictionary codes while the SQL in phonepe.py keeps comparing
+strings.  A value outside them (a state missing from
+``ingest.state_name_mapping``, a transaction type Pulse adds later) cannot
+be stored: load.BulkLoader rejects such a batch with ValueError before
+writing it.  Add the value to STATES / TRANSACTION_TYPES and to the column
+of the existing tables (``ALTER TABLE ... MODIFY ... ENUM(...)``) first.
+Years/Quarter are SMALLINT/TINYINT and amounts are DOUBLE (the old FLOAT
+columns lost precision above 2**24).
+"""
+import pandas as pd
+
+from ingest import state_name_mapping, KEY_COLUMNS
+
+STATES = sorted(set(state_name_mapping.values()))
+
+TRANSACTION_TYPES = (
+    "Financial Services",
+    "Merchant payments",
+    "Others",
+    "Peer-to-peer payments",
+    "Recharge & bill payments",
+)
+
+# Pulse data starts in 2018; RANGE partitions are created up to this year plus a
+# catch-all, so new years land in pmax until the next migrate().
+FIRST_YEAR = 2018
+LAST_YEAR = 2024
+
+
+def enum(values):
+    return "ENUM({})".format(", ".join("'{}'".format(v.replace("'", "''")) for v in values))
+
+
+KEY_TYPES = [
+    ("States", enum(STATES) + " NOT NULL"),
+    ("Years", "SMALLINT UNSIGNED NOT NULL"),
+    ("Quarter", "TINYINT UNSIGNED NOT NULL"),
+]
+
+# table -> (value columns with types, dimension column that completes the key)
+TABLES = {
+    "aggregated_insurance": ([
+        ("Insurance_type", "VARCHAR(32) NOT NULL"),
+        ("Insurance_count", "BIGINT UNSIGNED"),
+        ("Insurance_amount", "DOUBLE"),
+    ], "Insurance_type"),
+    "aggregated_transaction": ([
+        ("Transaction_type", enum(TRANSACTION_TYPES) + " NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Transaction_amount", "DOUBLE"),
+    ], "Transaction_type"),
+    "aggregated_user": ([
+        ("Brands", "VARCHAR(32) NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Percentage", "FLOAT"),
+    ], "Brands"),
+    "map_insurance": ([
+        ("District", "VARCHAR(64) NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Transaction_amount", "DOUBLE"),
+    ], "District"),
+    "map_transaction": ([
+        ("District", "VARCHAR(64) NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Transaction_amount", "DOUBLE"),
+    ], "District"),
+    "map_user": ([
+        ("District", "VARCHAR(64) NOT NULL"),
+        ("RegisteredUser", "BIGINT UNSIGNED"),
+        ("AppOpens", "BIGINT UNSIGNED"),
+    ], "District"),
+    "top_insurance": ([
+        ("Pincodes", "INT UNSIGNED NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Transaction_amount", "DOUBLE"),
+    ], "Pincodes"),
+    "top_transaction": ([
+        ("Pincodes", "INT UNSIGNED NOT NULL"),
+        ("Transaction_count", "BIGINT UNSIGNED"),
+        ("Transaction_amount", "DOUBLE"),
+    ], "Pincodes"),
+    "top_user": ([
+        ("Pincodes", "INT UNSIGNED NOT NULL"),
+        ("RegisteredUser", "BIGINT UNSIGNED"),
+    ], "Pincodes"),
+}
+
+
+def columns(table):
+    return KEY_COLUMNS + tuple(name for name, _ in TABLES[table][0])
+
+
+def pandas_dtypes(table):
+    """numpy dtype per column, as written to Parquet and read back by DuckDB."""
+    dtypes = {"States": "object", "Years": "int64", "Quarter": "int64"}
+    for name, sql_type in TABLES[table][0]:
+        if sql_type.startswith(("DOUBLE", "FLOAT")):
+            dtypes[name] = "float64"
+        elif "INT" in sql_type.split("(")[0]:
+            dtypes[name] = "int64"
+        else:
+            dtypes[name] = "object"
+    return dtypes
+
+
+# QUERY RESULT TYPES
+# The dashboard's columns mean the same thing in every table, rollup and
+# aggregate, so query results are typed by column name (see ``typed``):
+# dimensions become categoricals - closed vocabularies with their full list,
+# so frames of different queries compare and merge on the same codes - and
+# numerics the narrowest type that holds them.  Counts and amounts stay 64-bit:
+# All-India counts pass 2**31 and float32 would round amounts.
+RESULT_TYPES = {
+    "States": pd.CategoricalDtype(STATES),
+    "Transaction_type": pd.CategoricalDtype(TRANSACTION_TYPES),
+    "Insurance_type": "category",
+    "Brands": "category",
+    "District": "category",
+    "Years": "int16",
+    "Quarter": "int8",
+    "Pincodes": "int32",
+    "State_rank": "int16",
+    "India_rank": "int16",
+    "Percentage": "float32",
+}
+
+
+EMPTY_CATEGORY = pd.CategoricalDtype(pd.Index([], dtype="str"))
+
+
+def result_type(column):
+    if column in RESULT_TYPES:
+        return RESULT_TYPES[column]
+    if column.endswith("_count") or column in ("RegisteredUser", "AppOpens"):
+        return "int64"
+    if column.endswith("_amount"):
+        return "float64"
+    return None
+
+
+def typed(df):
+    """``df`` with every known column in its result type (Decimal converted once, on the way in)."""
+    converted, dtypes = {}, {}
+    for column in df.columns:
+        dtype = result_type(column)
+        if dtype is None or df[column].dtype == dtype:
+            continue
+        values = df[column]
+        if isinstance(dtype, pd.CategoricalDtype):
+            if not values.isin(dtype.categories).all():  # a value outside the vocabulary: keep it
+                dtype = "category"
+        elif dtype == "category":
+            if values.empty:  # no values to infer the category type from: labels are strings
+                dtype = EMPTY_CATEGORY
+        else:
+            if values.dtype == object:  # MySQL returns SUM() and DECIMAL as Decimal
+                values = converted[column] = pd.to_numeric(values)
+            if values.isna().any():
+                dtype = "float64"
+        dtypes[column] = dtype
+    if converted:
+        df = df.assign(**converted)
+    return df.astype(dtypes) if dtypes else df
+
+
+def primary_key(table):
+    return ("Years", "Quarter", "States", TABLES[table][1])
+
+
+def partition_clause(first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    parts = ["PARTITION p{0} VALUES LESS THAN ({1})".format(y, y + 1)
+             for y in range(first_year, last_year + 1)]
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (Years) (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def create_table_sql(table, name=None, partitioned=False):
+    value_columns, _ = TABLES[table]
+    lines = ["{} {}".format(c, t) for c, t in KEY_TYPES + value_columns]
+    lines.append("PRIMARY KEY ({})".format(", ".join(primary_key(table))))
+    lines.append("KEY idx_state_period (States, Years, Quarter)")
+    sql = "CREATE TABLE IF NOT EXISTS {} (\n    {}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4".format(
+        name or table, ",\n    ".join(lines))
+    if partitioned:
+        sql += "\n" + partition_clause()
+    return sql
+
+
+def create_tables(cursor, tables=None, partitioned=False):
+    for table in tables or TABLES:
+        cursor.execute(create_table_sql(table, partitioned=partitioned))
+
+
+VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS pulse_version (
+        id TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+        version BIGINT UNSIGNED NOT NULL
+    ) ENGINE=InnoDB"""
+
+
+def bump_version(cursor):
+    """Advance the data version that dashboard caches poll (see query_cache.py)."""
+    cursor.execute(VERSION_DDL)
+    cursor.execute("INSERT INTO pulse_version (id, version) VALUES (1, 1) "
+                   "ON DUPLICATE KEY UPDATE version = version + 1")
+
+
+def has_primary_key(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.table_constraints "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND constraint_type = 'PRIMARY KEY'",
+        (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL",
+        (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def vocabulary(column):
+    """Allowed values of an ENUM column (States, Transaction_type), or None."""
+    return {"States": STATES, "Transaction_type": TRANSACTION_TYPES}.get(column)
+
+
+def unknown_values(table, df):
+    """{column: values} of ``df`` outside the ENUM vocabularies of ``table``."""
+    unknown = {}
+    for column in columns(table):
+        allowed = vocabulary(column)
+        if allowed is not None and column in df.columns:
+            values = sorted(set(df[column].dropna().astype(str)) - set(allowed))
+            if values:
+                unknown[column] = values
+    return unknown
+
+
+def _scalar(cursor, sql):
+    cursor.execute(sql)
+    return cursor.fetchone()[0]
+
+
+def migrate(cursor, tables=None, partitioned=False):
+    """Rebuild legacy notebook tables (no key, VARCHAR(50)/INT) into this schema.
+
+    The distinct rows are copied with a plain INSERT (the exact duplicates
+    that repeated notebook runs left behind are dropped by DISTINCT), then
+    swapped in with an atomic RENAME TABLE.  The copy is checked first: a
+    warning (e.g. a state or type outside the ENUM, stored as '' by a
+    non-strict server) or a row count other than the source's number of
+    distinct keys raises RuntimeError and leaves the legacy table in place.
+    Rows that conflict on the key fail the INSERT itself.  Tables already
+    carrying the primary key (and, when ``partitioned`` is requested, the
+    Years partitioning) are left alone.
+    """
+    migrated = []
+    for table in tables or TABLES:
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        if cursor.fetchone() is None:
+            cursor.execute(create_table_sql(table, partitioned=partitioned))
+            continue
+        if has_primary_key(cursor, table) and (not partitioned or is_partitioned(cursor, table)):
+            continue
+
+        new, old = table + "__new", table + "__old"
+        cols = ", ".join(columns(table))
+        cursor.execute("DROP TABLE IF EXISTS {}".format(new))
+        cursor.execute(create_table_sql(table, name=new, partitioned=partitioned))
+        cursor.execute("INSERT INTO {0} ({1}) SELECT DISTINCT {1} FROM {2}".format(new, cols, table))
+        cursor.execute("SHOW WARNINGS")
+        warnings = cursor.fetchall()
+        copied = _scalar(cursor, "SELECT COUNT(*) FROM {}".format(new))
+        keys = _scalar(cursor, "SELECT COUNT(*) FROM (SELECT DISTINCT {} FROM {}) k".format(
+            ", ".join(primary_key(table)), table))
+        if warnings or copied != keys:
+            cursor.execute("DROP TABLE {}".format(new))
+            raise RuntimeError("{}: copied {} rows for {} distinct keys{}; the table was not migrated".format(
+                table, copied, keys, ", warnings: {}".format(list(warnings[:5])) if warnings else ""))
+        cursor.execute("RENAME TABLE {0} TO {1}, {2} TO {0}".format(table, old, new))
+        cursor.execute("DROP TABLE {}".format(old))
+        migrated.append(table)
+    return migrated
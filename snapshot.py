@@ -0,0 +1,129 @@
+"""Immutable, versioned Arrow snapshots of the nine Pulse tables and the rollups.
+
+``publish(backend)`` reads every table once and writes
+``<PHONEPE_SNAPSHOT_DIR>/v<version>/<table>.arrow`` - uncompressed Arrow IPC
+files, rows sorted by (Years, Quarter, States, item) and States and item
+dictionary-encoded with sorted dictionaries - then points ``CURRENT`` at it.
+The version directory is renamed into place and ``CURRENT`` replaced
+atomically, so a reader sees either the old snapshot or the whole new one.
+The last ``KEEP`` versions stay on disk for workers still mapping them.
+
+``read(directory, version)`` memory-maps a snapshot: the tables are Arrow
+views of the files, with no parsing or copying, and every worker process on
+the host shares the same pages of the OS page cache.  cube.Cube builds its
+facts from them directly - the dictionary indices are its dimension codes and
+the metric columns its arrays - so a worker's cold start is an mmap rather
+than a round of queries.
+
+load.refresh / load.refresh_parquet publish after every load that changed
+data when given ``snapshot_dir``; ``python snapshot.py`` publishes the
+configured backend's current data.
+"""
+import argparse
+import os
+import shutil
+
+import pandas as pd
+
+import config
+import rollups
+import schema
+
+CURRENT = "CURRENT"
+KEEP = 2
+
+# table -> dimension completing (Years, Quarter, States); rollups without States are by period only
+ITEMS = dict({table: item for table, (_, item) in schema.TABLES.items()},
+             rollup_state_quarter=None, rollup_district_quarter="District")
+TABLES = tuple(schema.TABLES) + rollups.ROLLUPS
+
+
+def version_dir(directory, version):
+    return os.path.join(directory, "v{}".format(version))
+
+
+def current_version(directory=config.SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, CURRENT), "r") as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def to_table(df, item):
+    """Sorted, dictionary-encoded Arrow table of one Pulse table or rollup."""
+    import pyarrow as pa
+
+    dims = [d for d in ("States", item) if d and d in df.columns]
+    df = df.sort_values(["Years", "Quarter"] + dims, kind="mergesort").reset_index(drop=True)
+    columns = {}
+    for name in df.columns:
+        if name in dims:
+            codes, labels = pd.factorize(df[name], sort=True)
+            columns[name] = pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(labels))
+        else:
+            columns[name] = pa.array(df[name])
+    return pa.table(columns)
+
+
+def publish(backend, directory=config.SNAPSHOT_DIR, version=None):
+    """Write a snapshot of ``backend``'s data and make it current; returns its path."""
+    import pyarrow as pa
+
+    version = backend.data_version() if version is None else version
+    target = version_dir(directory, version)
+    if not os.path.isdir(target):
+        tmp = "{}.tmp-{}".format(target, os.getpid())
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for table in TABLES:
+            arrow = to_table(backend.read_sql("SELECT * FROM {}".format(table)), ITEMS[table])
+            with pa.OSFile(os.path.join(tmp, table + ".arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, arrow.schema) as writer:
+                    writer.write_table(arrow, max_chunksize=max(arrow.num_rows, 1))
+        try:
+            os.replace(tmp, target)
+        except OSError:  # another process published this version first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(target):
+                raise
+    pointer = os.path.join(directory, CURRENT)
+    with open(pointer + ".tmp", "w") as fh:
+        fh.write(str(version))
+    os.replace(pointer + ".tmp", pointer)
+    prune(directory)
+    return target
+
+
+def prune(directory=config.SNAPSHOT_DIR, keep=KEEP):
+    """Remove all but the newest ``keep`` versions (open mappings stay valid)."""
+    versions = sorted(int(name[1:]) for name in os.listdir(directory)
+                      if name.startswith("v") and name[1:].isdigit())
+    for version in versions[:-keep]:
+        shutil.rmtree(version_dir(directory, version), ignore_errors=True)
+
+
+def read(directory=config.SNAPSHOT_DIR, version=None, tables=TABLES):
+    """{table: memory-mapped pyarrow.Table} of ``version`` (default: current), or None if absent."""
+    import pyarrow as pa
+
+    version = current_version(directory) if version is None else version
+    path = version_dir(directory, version) if version is not None else None
+    if path is None or not os.path.isdir(path):
+        return None
+    return {table: pa.ipc.open_file(pa.memory_map(os.path.join(path, table + ".arrow"), "r")).read_all()
+            for table in tables}
+
+
+def main(argv=None):
+    from backend import get_backend
+
+    parser = argparse.ArgumentParser(description="Publish an Arrow snapshot of the dashboard data.")
+    parser.add_argument("--directory", default=config.SNAPSHOT_DIR)
+    parser.add_argument("--backend", default=None, help="mysql or duckdb (default: PHONEPE_BACKEND)")
+    args = parser.parse_args(argv)
+    print(publish(get_backend(args.backend), args.directory))
+
+
+if __name__ == "__main__":
+    main()
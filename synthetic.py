@@ -0,0 +1,121 @@
+"""Synthetic PhonePe Pulse data for tests and benchmarks.
+
+``generate(root)`` writes the Pulse directory layout - aggregated / map / top
+x transaction / user / insurance, ``country/india/state/<state>/<year>/<q>.json``
+- with the record shapes ingest.EXTRACTORS reads, so the whole pipeline
+(extract, load, rollups, dashboard) runs without the real pulse/data tree.
+Values grow quarter on quarter with some noise, so trends look like trends.
+
+``write_boundaries(directory)`` writes a matching India states GeoJSON (one
+many-vertex polygon per state) for geo.py, so maps work offline too.
+"""
+import json
+import math
+import os
+import random
+
+import ingest
+import schema
+
+BRANDS = ("Xiaomi", "Samsung", "Vivo", "Oppo", "Realme", "Apple", "OnePlus", "Motorola", "Huawei", "Others")
+
+
+def state_dirs(n):
+    """The first ``n`` Pulse state directory names (all 36 if ``n`` is larger)."""
+    return list(ingest.state_name_mapping)[:n]
+
+
+def districts(state, n):
+    return ["{} district {}".format(ingest.state_name_mapping[state], i + 1) for i in range(n)]
+
+
+def pincodes(state, n):
+    base = 110000 + 10000 * (list(ingest.state_name_mapping).index(state) % 80)
+    return [str(base + i) for i in range(n)]
+
+
+def _assign(record, field, value):
+    """Set ``value`` at a lookup path like ("paymentInstruments", 0, "count")."""
+    for key, nxt in zip(field, field[1:]):
+        if isinstance(key, int):
+            while len(record) <= key:
+                record.append({})
+            record = record[key]
+        else:
+            record = record.setdefault(key, [] if isinstance(nxt, int) else {})
+    record[field[-1]] = value
+
+
+def _names(table, state, n_districts, n_pincodes):
+    dim = ingest.EXTRACTORS[table].columns[0]
+    return {
+        "Transaction_type": list(schema.TRANSACTION_TYPES),
+        "Insurance_type": ["Insurance"],
+        "Brands": list(BRANDS),
+        "District": districts(state, n_districts),
+        "Pincodes": pincodes(state, n_pincodes),
+    }[dim]
+
+
+def _value(column, scale, rng):
+    value = scale * rng.uniform(0.5, 1.5)
+    if "amount" in column:
+        return round(value * rng.uniform(800, 2500), 2)
+    if column == "Percentage":
+        return round(rng.random(), 4)
+    return int(value)
+
+
+def records(table, state, period, n_districts=30, n_pincodes=10, rng=random):
+    """The ``data`` payload of one quarter file."""
+    spec = ingest.EXTRACTORS[table]
+    scale = 1000 * 1.08 ** period  # ~8% growth per quarter
+    rows = []
+    for name in _names(table, state, n_districts, n_pincodes):
+        record = {}
+        _assign(record, spec.fields[0], name)
+        for column, field in zip(spec.columns[1:], spec.fields[1:]):
+            _assign(record, field, _value(column, scale, rng))
+        rows.append(record)
+    if spec.items:
+        rows = {r.pop("name"): r for r in rows}
+    return {spec.records: rows}
+
+
+def generate(root, states=36, districts_per_state=30, pincodes_per_state=10,
+             years=(schema.FIRST_YEAR, schema.LAST_YEAR), tables=None, seed=0):
+    """Write a Pulse-shaped tree under ``root``; return the number of files written."""
+    rng = random.Random(seed)
+    written = 0
+    for table in tables or ingest.EXTRACTORS:
+        for state in state_dirs(states):
+            for year in range(years[0], years[1] + 1):
+                year_dir = os.path.join(ingest.state_root(table, root), state, str(year))
+                os.makedirs(year_dir, exist_ok=True)
+                for quarter in range(1, 5):
+                    period = (year - years[0]) * 4 + quarter - 1
+                    data = records(table, state, period, districts_per_state, pincodes_per_state, rng)
+                    with open(os.path.join(year_dir, "{}.json".format(quarter)), "w", encoding="utf-8") as fh:
+                        json.dump({"success": True, "data": data}, fh)
+                    written += 1
+    return written
+
+
+def write_boundaries(directory, states=36, vertices=2000):
+    """Stand-in boundaries for geo.py: one ``vertices``-point ring per state on a grid."""
+    import geo
+
+    features = []
+    for i, state in enumerate(state_dirs(states)):
+        cx, cy = 70 + 3 * (i % 8), 10 + 3 * (i // 8)
+        ring = [[round(cx + 1.4 * math.cos(t) + 0.05 * math.sin(25 * t), 5),
+                 round(cy + 1.4 * math.sin(t) + 0.05 * math.cos(25 * t), 5)]
+                for t in (2 * math.pi * k / vertices for k in range(vertices))]
+        ring.append(ring[0])
+        features.append({"type": "Feature", "properties": {"ST_NM": ingest.state_name_mapping[state]},
+                         "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    path = geo.level_path("full", directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"type": "FeatureCollection", "features": features}, fh)
+    return path
@@ -0,0 +1,34 @@
+"""A small synthetic Pulse store shared by the tests (see synthetic.py).
+
+The tree is generated once per session, loaded into Parquet with
+load.refresh_parquet and read through the DuckDB backend, so the tests run
+without MySQL or the real Pulse data.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import load  # noqa: E402
+import synthetic  # noqa: E402
+from backend import DuckDBBackend  # noqa: E402
+
+YEARS = (2022, 2023)
+LATEST = (2023, 4)
+
+
+@pytest.fixture(scope="session")
+def pulse(tmp_path_factory):
+    """``(root, parquet directory)`` of a loaded synthetic tree: 3 states, 2 years."""
+    base = tmp_path_factory.mktemp("pulse")
+    root, directory = str(base / "pulse"), str(base / "parquet")
+    synthetic.generate(root, states=3, districts_per_state=4, pincodes_per_state=3, years=YEARS)
+    load.refresh_parquet(directory, root=root, workers=1)
+    return root, directory
+
+
+@pytest.fixture(scope="session")
+def backend(pulse):
+    return DuckDBBackend(pulse[1])
@@ -0,0 +1,54 @@
+"""The in-memory cube answers every data_access read exactly as SQL does."""
+import pandas as pd
+import pytest
+
+import cube
+import data_access as da
+import snapshot
+from conftest import LATEST
+from query_cache import CachedBackend
+
+# every read of data_access.py, for the latest quarter and one without data
+READS = [
+    (da.states, ()),
+    (da.state_history, ()),
+    (da.brand_history, ()),
+    (da.insurance_history, ()),
+] + [(fn, period) for period in (LATEST, (2019, 1)) for fn in (
+    da.state_quarter, da.types_by_state, da.brands_by_state, da.districts, da.top_pincodes,
+    da.top_insurance_by_state)]
+
+DIMENSIONS = ["Years", "Quarter", "States", "Transaction_type", "Brands", "District", "Pincodes"]
+
+
+def in_order(df):
+    """SQL leaves most row orders unspecified; compare on the dimensions."""
+    return df.sort_values([c for c in DIMENSIONS if c in df.columns]).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module", params=["sql", "snapshot"])
+def cubed_db(request, backend, tmp_path_factory):
+    """A CachedBackend answering from a cube built from SQL or from a published snapshot."""
+    db = CachedBackend(backend)
+    directory = None
+    if request.param == "snapshot":
+        directory = str(tmp_path_factory.mktemp("snapshot"))
+        snapshot.publish(backend, directory)
+    db.cube = cube.Cube.load(backend, db.version, directory)
+    assert db.cube.source == request.param
+    return db
+
+
+@pytest.mark.parametrize("read, args", READS, ids=lambda v: getattr(v, "__name__", str(v)))
+def test_cube_matches_sql(cubed_db, backend, read, args):
+    expected = read(CachedBackend(backend), *args)
+    result = read(cubed_db, *args)
+    if isinstance(expected, list):
+        assert result == expected
+    else:
+        pd.testing.assert_frame_equal(in_order(result), in_order(expected))
+
+
+def test_cube_reads_are_cached(cubed_db):
+    first = da.state_quarter(cubed_db, *LATEST)
+    assert da.state_quarter(cubed_db, *LATEST) is first
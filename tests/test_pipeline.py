@@ -0,0 +1,130 @@
+"""Ingestion, formatting, map simplification and cache invalidation on the synthetic store.
+
+The cube-vs-SQL comparison over the same store is in test_cube.py.
+"""
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import geo
+import load
+import ranked_list
+import schema
+from backend import DuckDBBackend, bump_parquet_version, parquet_version
+from conftest import LATEST
+from query_cache import CachedBackend
+
+
+@pytest.fixture
+def store(pulse, tmp_path):
+    """``(root, parquet directory)`` with a private copy of the session's Parquet store."""
+    root, directory = pulse
+    copy = str(tmp_path / "parquet")
+    shutil.copytree(directory, copy)
+    return root, copy
+
+
+def row_counts(directory):
+    db = DuckDBBackend(directory)
+    return {table: int(db.read_sql("SELECT COUNT(*) AS n FROM {}".format(table))["n"].iloc[0])
+            for table in schema.TABLES}
+
+
+# MANIFEST
+def test_second_refresh_loads_nothing(store):
+    root, directory = store
+    counts, version = row_counts(directory), parquet_version(directory)
+    assert all(counts.values())
+
+    stats = load.refresh_parquet(directory, root=root, workers=1)
+    assert sum(stat["rows"] for stat in stats.values()) == 0
+    assert parquet_version(directory) == version
+    assert row_counts(directory) == counts
+
+
+# RANKED LISTS
+def test_indian_digit_grouping():
+    values = pd.Series([12345678, 1234.6, 999, -1234567, np.nan, 10 ** 9])
+    assert ranked_list.indian(values).tolist() == [
+        "1,23,45,678", "1,235", "999", "-12,34,567", "0", "1,00,00,00,000"]
+
+
+def test_markdown_list():
+    df = pd.DataFrame({"State": ["Kerala", "Goa"], "Total": [150000.0, 2500.0]})
+    assert ranked_list.markdown(df, "State", "Total", prefix="₹") == (
+        "- **Kerala** : ₹1,50,000\n- **Goa** : ₹2,500")
+
+
+# MAP SIMPLIFICATION
+def wobbly_ring(points=401):
+    """A closed ring around a unit circle with small wiggles Douglas-Peucker should drop."""
+    t = np.linspace(0, 2 * np.pi, points)
+    r = 1 + 0.001 * np.sin(40 * t)
+    ring = np.c_[80 + r * np.cos(t), 20 + r * np.sin(t)]
+    ring[-1] = ring[0]
+    return ring.tolist()
+
+
+def test_simplify_ring_keeps_a_closed_outline():
+    ring = wobbly_ring()
+    simple = geo.simplify_ring(ring, geo.LEVELS["low"])
+    assert 4 <= len(simple) < len(ring) // 10
+    assert simple[0] == simple[-1]
+    radius = np.hypot(*(np.asarray(simple) - (80, 20)).T)
+    assert np.all(np.abs(radius - 1) < 0.01)
+
+
+def test_simplify_ring_keeps_small_islands():
+    island = [[80.0, 20.0], [80.001, 20.0], [80.001, 20.001], [80.0, 20.0]]
+    assert geo.simplify_ring(island, geo.LEVELS["low"]) == island
+
+
+def test_simplified_levels_are_written_from_a_local_source(tmp_path):
+    directory = str(tmp_path)
+    ring = wobbly_ring()
+    source = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"ST_NM": "Kerala"},
+         "geometry": {"type": "Polygon", "coordinates": [ring]}},
+        {"type": "Feature", "properties": {"ST_NM": "Goa"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [[ring], [ring]]}},
+    ]}
+    geo._write_json(geo.level_path("full", directory), source)  # on disk, so nothing is fetched
+
+    sizes = geo.build(directory)
+    assert sizes["low"] < sizes["medium"] < sizes["full"]
+    low = geo.load("low", directory)
+    assert [f["properties"]["ST_NM"] for f in low["features"]] == ["Kerala", "Goa"]
+    assert low["features"][1]["geometry"]["type"] == "MultiPolygon"
+    assert geo.load("full", directory) == source
+
+
+# CACHE INVALIDATION
+def test_cache_follows_the_data_version(store):
+    _, directory = store
+    db = CachedBackend(DuckDBBackend(directory), version_check=0)
+    invalidated = []
+    db.on_invalidate.append(lambda: invalidated.append(db.version))
+    query, params = "SELECT * FROM rollup_state_quarter WHERE Years = %s AND Quarter = %s", LATEST
+    first = db.read_sql(query, params)
+    assert db.read_sql(query, params) is first
+
+    bump_parquet_version(directory)
+    second = db.read_sql(query, params)
+    assert second is not first
+    assert invalidated == [parquet_version(directory)]
+    assert db.version == parquet_version(directory)
+    pd.testing.assert_frame_equal(second, first)
+    assert db.read_sql(query, params) is second
+
+
+def test_cache_is_kept_between_version_checks(store):
+    _, directory = store
+    db = CachedBackend(DuckDBBackend(directory), version_check=float("inf"))
+    query = "SELECT States FROM rollup_state_quarter"
+    first = db.read_sql(query)
+    bump_parquet_version(directory)
+    assert db.read_sql(query) is first
+    db.invalidate()
+    assert db.read_sql(query) is not first
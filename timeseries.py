@@ -0,0 +1,113 @@
+"""Quarterly time series of every state metric, held as one dense array.
+
+``StateSeries`` is built once per data version from ``rollup_state_quarter``
+(data_access.state_history) into a float array of shape
+``(period, state, metric)``.  Periods are every quarter from the first to the
+last loaded, so a lag of 1 is quarter-over-quarter and 4 is year-over-year;
+quarters a state has no data for are NaN.
+
+Trends, growth rates, CAGR and rolling windows for any state - or All India,
+the sum over states - are then array slices and arithmetic, with no SQL and
+no string building per call.
+"""
+import numpy as np
+import pandas as pd
+
+import data_access as da
+
+METRICS = [c.strip() for c in da.STATE_COLUMNS.split(",")]
+
+
+class StateSeries:
+    def __init__(self, periods, states, metrics, values):
+        self.periods = periods  # [(year, quarter)], consecutive quarters
+        self.states = states
+        self.metrics = metrics
+        self.values = values  # (period, state, metric), NaN where missing
+        self.labels = ["{}-Q{}".format(y, q) for y, q in periods]
+        self.state_index = {s: i for i, s in enumerate(states)}
+        self.metric_index = {m: i for i, m in enumerate(metrics)}
+
+    @classmethod
+    def from_history(cls, history, metrics=METRICS):
+        """Build from a frame with Years, Quarter, States and the metric columns."""
+        if history.empty:
+            return cls([], [], list(metrics), np.empty((0, 0, len(metrics))))
+        ordinal = history["Years"].astype("int64") * 4 + history["Quarter"].astype("int64") - 1
+        first, last = int(ordinal.min()), int(ordinal.max())
+        periods = [(o // 4, o % 4 + 1) for o in range(first, last + 1)]
+        states = sorted(history["States"].unique())
+        state_codes = pd.Categorical(history["States"], categories=states).codes
+        values = np.full((len(periods), len(states), len(metrics)), np.nan)
+        values[ordinal.to_numpy() - first, state_codes] = history[list(metrics)].to_numpy(dtype=float)
+        return cls(periods, states, list(metrics), values)
+
+    def _metric_slice(self, metrics):
+        return [self.metric_index[m] for m in metrics]
+
+    def region(self, state, metrics=None):
+        """(period, metric) array for one state, or summed over states for All India."""
+        cols = self._metric_slice(metrics or self.metrics)
+        if state == da.ALL_INDIA:
+            block = self.values[:, :, cols]
+            total = np.nansum(block, axis=1)
+            total[np.isnan(block).all(axis=1)] = np.nan
+            return total
+        if state not in self.state_index:
+            return np.full((len(self.periods), len(cols)), np.nan)
+        return self.values[:, self.state_index[state], cols]
+
+    def trend(self, state, metrics):
+        """QuarterLabel, Years, Quarter and ``metrics`` for the quarters with data."""
+        block = self.region(state, metrics)
+        present = ~np.isnan(block).all(axis=1)
+        df = pd.DataFrame(block[present], columns=list(metrics))
+        periods = np.array(self.periods, dtype="int64").reshape(-1, 2)[present]
+        df.insert(0, "Quarter", periods[:, 1])
+        df.insert(0, "Years", periods[:, 0])
+        df.insert(0, "QuarterLabel", np.array(self.labels, dtype=object)[present])
+        return df
+
+    # GROWTH
+    @staticmethod
+    def _growth(block, lag):
+        out = np.full(block.shape, np.nan)
+        if lag < len(block):
+            prev = block[:-lag]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[lag:] = np.where(prev > 0, block[lag:] / prev - 1, np.nan)
+        return out
+
+    def growth(self, state, metrics=None, lag=1):
+        """Growth over ``lag`` quarters per period: 1 = QoQ, 4 = YoY."""
+        return self._growth(self.region(state, metrics), lag)
+
+    def qoq(self, state, metrics=None):
+        return self.growth(state, metrics, lag=1)
+
+    def yoy(self, state, metrics=None):
+        return self.growth(state, metrics, lag=4)
+
+    def growth_all_states(self, metric, lag=1):
+        """(period, state) growth of one metric for every state at once."""
+        return self._growth(self.values[:, :, self.metric_index[metric]], lag)
+
+    def cagr(self, state, metrics=None, start=None, end=None):
+        """Compound annual growth between two (year, quarter) periods (default: first and last)."""
+        block = self.region(state, metrics)
+        i = self.periods.index(start) if start else 0
+        j = self.periods.index(end) if end else len(self.periods) - 1
+        years = (j - i) / 4
+        if years <= 0:
+            return np.full(block.shape[1], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(block[i] > 0, (block[j] / block[i]) ** (1 / years) - 1, np.nan)
+
+    def rolling(self, state, metrics=None, window=4):
+        """Rolling mean over ``window`` quarters (NaN until the window is full)."""
+        block = np.nan_to_num(self.region(state, metrics))
+        out = np.full(block.shape, np.nan)
+        if window <= len(block):
+            csum = np.cumsum(np.vstack([np.zeros((1, block.shape[1])), block]), axis=0)
+            out[window - 1:] = (csum[window:] - csum[:-window]) / window
+        return out
@@ -0,0 +1,113 @@
+"""Pre-warm the shared query cache so the first visitor does not pay for cold reads.
+
+``warm(db)`` reads, through a CachedBackend, everything the pages need for
+the latest ``WARMUP_QUARTERS`` quarters: the state list, the full histories
+(and the time series built from them), and per quarter every slice of
+data_access.py (and the rankings built from them).  Each slice holds all
+states, so every state selection of those quarters is served from memory
+afterwards.
+
+dashboard.py runs it in a background thread when the process starts and
+again whenever the cache is invalidated by a new data version.  Progress and
+timings are kept in ``status`` (shown in the operations panel) and logged.
+"""
+import logging
+import threading
+import time
+
+import config
+import data_access as da
+import metrics
+
+log = logging.getLogger(__name__)
+
+PERIOD_SLICES = {
+    "state_quarter": da.state_quarter,
+    "types_by_state": da.types_by_state,
+    "brands_by_state": da.brands_by_state,
+    "districts": da.districts,
+    "top_pincodes": da.top_pincodes,
+    "top_insurance_by_state": da.top_insurance_by_state,
+}
+HISTORIES = {
+    "states": da.states,
+    "state_history": da.state_history,
+    "brand_history": da.brand_history,
+    "insurance_history": da.insurance_history,
+}
+
+status = {"state": "idle"}
+_lock = threading.Lock()
+
+
+@metrics.named
+def latest_periods(db, n=config.WARMUP_QUARTERS):
+    q = """SELECT DISTINCT Years, Quarter FROM rollup_state_quarter
+           ORDER BY Years DESC, Quarter DESC LIMIT {:d}""".format(n)
+    df = db.read_sql(q)
+    return list(zip(df["Years"].astype(int), df["Quarter"].astype(int)))
+
+
+def warm(db, periods=None, n=config.WARMUP_QUARTERS, extra=(), per_period=(), progress=None):
+    """Fill the cache for ``periods`` (default: the latest ``n``); return per-step seconds.
+
+    ``extra`` are more ``(label, callable)`` steps (e.g. building the time
+    series); ``per_period`` callables are called as ``fn(year, quarter)``
+    after each period's slices are read (e.g. building its rankings).
+    ``progress(done, total, label)`` is called after every step.
+    """
+    start = time.perf_counter()
+    periods = latest_periods(db, n) if periods is None else list(periods)
+    steps = [("histories", lambda: da.fetch(db, **{k: (fn,) for k, fn in HISTORIES.items()}))]
+    steps += list(extra)
+    steps += [("{}-Q{}".format(y, q), lambda y=y, q=q: warm_period(db, y, q, per_period)) for y, q in periods]
+    timings = {}
+    for i, (label, step) in enumerate(steps, 1):
+        t = time.perf_counter()
+        try:
+            step()
+            timings[label] = round(time.perf_counter() - t, 3)
+        except Exception as e:  # one failed step leaves the rest worth warming
+            timings[label] = None
+            log.warning("warm-up %s failed: %s", label, e)
+        status.update(done=i, total=len(steps), last=label)
+        log.info("warm-up %d/%d %s in %.3fs", i, len(steps), label, time.perf_counter() - t)
+        if progress:
+            progress(i, len(steps), label)
+    timings["total"] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def warm_period(db, year, quarter, per_period=()):
+    da.fetch(db, **{k: (fn, year, quarter) for k, fn in PERIOD_SLICES.items()})
+    for fn in per_period:
+        fn(year, quarter)
+
+
+def warm_in_background(db, **kwargs):
+    """Run ``warm`` in a daemon thread; if one is running, it runs once more when done."""
+    with _lock:
+        if status.get("state") == "running":
+            status["pending"] = True
+            return None
+        status.clear()
+        status.update(state="running", started=time.time())
+
+    def run():
+        while True:
+            try:
+                status["timings"] = warm(db, **kwargs)
+                log.info("warm-up finished in %.3fs", status["timings"]["total"])
+                state = "done"
+            except Exception as e:  # a cold cache is still a working cache
+                status["error"] = str(e)
+                log.warning("warm-up failed: %s", e)
+                state = "failed"
+            with _lock:
+                if not status.pop("pending", False):
+                    status["state"] = state
+                    return
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread